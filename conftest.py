@@ -0,0 +1,4 @@
+# conftest.py
+"""
+Lets the tests under tests/ import the app as src.* when pytest is run from the repo root
+"""
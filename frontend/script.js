@@ -241,7 +241,7 @@ async function generateImageDirect() {
                 <div class="success">Image generated successfully!</div>
                 <div><strong style="margin-bottom: 15px">Type:</strong> ${imageData.image_type}</div>
                 <div><strong style="margin-bottom: 15px">Prompt :</strong> ${imageData.prompt_used}</div>
-                <img src="data:image/jpeg;base64,${imageData.image_data}" style="max-width: 100%; border-radius: 8px; margin-top: 10px;" alt="Generated image">
+                <img src="data:${imageData.mime_type || 'image/png'};base64,${imageData.image_data}" style="max-width: 100%; border-radius: 8px; margin-top: 10px;" alt="Generated image">
             `;
         } else {
             resultDiv.innerHTML = `<div class="error">Failed to generate image</div>`;
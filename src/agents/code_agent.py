@@ -8,15 +8,209 @@ Code Generation Agent with dual strategy:
 
 import os
 import re
-from typing import Dict, Any, List, Optional
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.schema import SystemMessage, HumanMessage
-# from transformers import AutoTokenizer, AutoModelForCausalLM  # Commented out - uncomment to use fine-tuned model
+import asyncio
+from functools import lru_cache
+from string import Template
+from types import MappingProxyType
+from typing import Dict, Any, List, Tuple, Optional, Callable, AsyncIterator, Mapping, NamedTuple
+# LangChain / Gemini imports are deferred to CodeAgent.__init__ - importing this
+# module (e.g. for type hints) shouldn't pull in langchain, grpc and protobuf
+# from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig  # Commented out - uncomment to use fine-tuned model
 # from peft import PeftModel  # Commented out - uncomment to use fine-tuned model
 # import torch  # Commented out - uncomment to use fine-tuned model
 from dotenv import load_dotenv
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+from src.utils.circuit_breaker import CircuitBreaker
+from src.utils.code_scan import count_lines_and_emoji
+from src.utils.streaming import stream_generation
+from src.utils.ttl_cache import TTLCache, make_cache_key
+from src.utils.logger import get_logger
+
+logger = get_logger("code_agent")
+
+# Only read .env once per process tree - spawned workers inherit the loaded environment
+if not os.getenv("JARVIS_ENV_LOADED"):
+    load_dotenv()
+    os.environ["JARVIS_ENV_LOADED"] = "1"
+
+# Read once at import rather than on every client build
+_GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+# How long Gemini gets before the fine-tuned fallback is raced against it
+_HEDGE_DELAY_SECONDS = int(os.getenv("JARVIS_HEDGE_MS", "10000")) / 1000
+
+# Cap on generated tokens - decode time grows with output length, and a simple
+# single-file app fits comfortably in this budget
+_MAX_OUTPUT_TOKENS = int(os.getenv("JARVIS_MAX_OUTPUT_TOKENS", "4096"))
+
+# Max Gemini requests in flight when generating several apps at once
+_LLM_CONCURRENCY = int(os.getenv("JARVIS_LLM_CONCURRENCY", "8"))
+
+# Quick retries for transient Gemini errors (429/503/timeouts) - far cheaper
+# than escalating to the fine-tuned model
+_GEMINI_RETRY_ATTEMPTS = 3
+
+# Upper bound on a single Gemini attempt - a hung request times out and is retried
+# instead of stalling the whole generation
+_GEMINI_TIMEOUT_SECONDS = float(os.getenv("JARVIS_GEMINI_TIMEOUT", "60"))
+
+
+@lru_cache(maxsize=1)
+def _transient_gemini_errors() -> tuple:
+    """
+    Exception types worth retrying - google.api_core comes in with the Gemini client
+    """
+    errors = [asyncio.TimeoutError, TimeoutError]
+    try:
+        from google.api_core import exceptions as google_exceptions
+        errors += [google_exceptions.ResourceExhausted, google_exceptions.ServiceUnavailable]
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+# System prompt for Gemini app generation - filled in by ChatPromptTemplate
+# Kept short on purpose: every prompt token adds to latency and cost
+# Static instructions come first and per-app fields last, so every request shares
+# the same prefix for Gemini's implicit prompt caching
+_SYSTEM_TEMPLATE = """Generate a complete single-file Streamlit app.py for the app described below.
+Use st.columns/st.tabs, page config, sidebar navigation, sample data, fitting charts, error handling, session state and st.cache_data. Add tooltips, a header and a footer.
+Keep it focused, well-commented and production-ready. No emojis. Return only Python code, no markdown fences.
+
+App: {app_name}, a {app_category} app
+Description: {app_description}
+Additional requirements: {requirements}
+Features:
+{category_features}"""
+_HUMAN_TEMPLATE = "Create a simple, focused Streamlit app for {app_name}"
+
+# Markdown fence Gemini sometimes wraps the code in despite the prompt - anchored to the
+# start/end of the response so the body itself is never scanned for fences
+_FENCE_RE = re.compile(r"\A\s*```(?:python|py)?[ \t]*\n|\n?```\s*\Z")
+
+# Category lookup tables - built once at import so each call is a single dict lookup
+# Read-only views so a caller can't accidentally change them for every later request
+_CATEGORY_FEATURES: Mapping[str, str] = MappingProxyType({
+    "finance": "- Financial dashboard with key metrics\n- Simple budget tracking\n- Basic financial calculator\n- Interactive charts",
+    "healthcare": "- Health metrics display\n- Simple progress tracking\n- BMI calculator\n- Basic health visualizations",
+    "education": "- Simple course browser\n- Basic progress tracking\n- Interactive quiz component\n- Learning dashboard",
+    "entertainment": "- Content display interface\n- Simple rating system\n- Basic recommendations\n- User-friendly navigation",
+    "travel": "- Destination browser\n- Simple trip information\n- Basic budget calculator\n- Photo gallery",
+    "food": "- Recipe browser\n- Simple meal planner\n- Basic nutrition info\n- Cooking timer",
+    "productivity": "- Task management interface\n- Simple progress tracking\n- Basic analytics\n- User-friendly dashboard"
+})
+_DEFAULT_FEATURES = "- Simple interactive dashboard\n- Basic data visualization\n- User input forms\n- Core functionality"
+
+_BASE_REQUIREMENTS = (
+    "streamlit>=1.28.0",
+    "pandas>=1.5.0",
+    "numpy>=1.24.0",
+    "plotly>=5.15.0"
+)
+_CATEGORY_REQUIREMENTS: Mapping[str, tuple] = MappingProxyType({
+    "finance": ("yfinance",),
+    "healthcare": ("scikit-learn",),
+    "education": ("matplotlib",),
+    "entertainment": ("requests",),
+    "travel": ("folium",),
+    "food": ("requests",)
+})
+# Final requirements.txt text per category, joined once at import
+_REQS_BY_CATEGORY: Mapping[str, str] = MappingProxyType({
+    category: "\n".join(_BASE_REQUIREMENTS + extra)
+    for category, extra in _CATEGORY_REQUIREMENTS.items()
+})
+_DEFAULT_REQS = "\n".join(_BASE_REQUIREMENTS)
+
+_BASE_STEPS = (
+    "1. Test the app locally with 'streamlit run app.py'",
+    "2. Customize the UI colors and themes",
+    "3. Replace sample data with real data sources",
+    "4. Add your own branding and styling"
+)
+_CATEGORY_STEPS: Mapping[str, tuple] = MappingProxyType({
+    "finance": ("5. Connect to financial APIs", "6. Add real-time data updates"),
+    "healthcare": ("5. Ensure data privacy compliance", "6. Add data validation"),
+    "education": ("5. Add user progress tracking", "6. Implement content management"),
+    "entertainment": ("5. Add content recommendation", "6. Implement user ratings")
+})
+
+@lru_cache(maxsize=16)
+def _next_steps_for(app_category: str) -> Tuple[str, ...]:
+    """Build the next-steps list once per category"""
+    return _BASE_STEPS + _CATEGORY_STEPS.get(app_category, ("5. Add category-specific features",)) + ("6. Deploy to Streamlit Cloud",)
+
+# Generated README body (everything after title and description) - only $model_used varies
+_README_BODY_TEMPLATE = Template("""## Generated by Steve Connect
+- **Primary Model**: Google Gemini 2.0 Flash
+- **Fallback Model**: kunalsahjwani/qwen-streamlit-coder  
+- **Model Used**: $model_used
+- **App Type**: Simple, focused functionality
+
+## Installation
+```bash
+pip install -r requirements.txt
+streamlit run app.py
+```
+
+## Features
+- Simple, focused functionality
+- Interactive web interface
+- Real-time data visualization
+- Modern UI components
+- Responsive design
+
+## Customization
+- Edit app.py to modify functionality
+- Update requirements.txt for additional dependencies
+- Customize styling and themes
+- Add your own data sources
+
+## Deployment
+Deploy to Streamlit Cloud:
+1. Push to GitHub
+2. Connect to Streamlit Cloud
+3. Deploy with one click!
+""")
+
+# model_used is almost always one of these two, so their README bodies are rendered once at import
+_README_BODY_BY_MODEL = {
+    model: _README_BODY_TEMPLATE.substitute(model_used=model)
+    for model in ("gemini-2.0-flash", "kunalsahjwani/qwen-streamlit-coder")
+}
+
+@lru_cache(maxsize=128)
+def _render_readme(app_name: str, app_description: str, model_used: str) -> str:
+    """Full README text - pure string work, so repeat apps reuse the result"""
+    body = _README_BODY_BY_MODEL.get(model_used) or _README_BODY_TEMPLATE.substitute(model_used=model_used)
+    return f"# {app_name}\n\n{app_description}\n\n{body}"
+
+# Development notes that are the same for every app
+_STATIC_NOTES = (
+    "Simple, focused functionality",
+    "Run 'pip install -r requirements.txt' to install dependencies",
+    "Run 'streamlit run app.py' to start the app",
+    "App will open in your browser at http://localhost:8501",
+    "Customize the app by editing app.py",
+    "Add your own data sources and APIs"
+)
+
+class AppIdea(NamedTuple):
+    """
+    App spec read out of an ideation dict once, with the generator's defaults applied
+    """
+    name: str
+    category: str
+    description: str
+    
+    @classmethod
+    def from_dict(cls, app_idea: Dict[str, Any]) -> "AppIdea":
+        return cls(
+            app_idea.get("name", "MyApp"),
+            app_idea.get("category", "productivity"),
+            app_idea.get("description", "A web application")
+        )
 
-load_dotenv()
 
 class CodeAgent:
     """
@@ -24,21 +218,44 @@ class CodeAgent:
     Always generates simple, focused Streamlit apps
     """
     
+    # Fixed attribute set - no per-instance __dict__
+    __slots__ = (
+        "llm",
+        "_gemini_chain",
+        "gemini_available",
+        "finetuned_model",
+        "finetuned_tokenizer",
+        "finetuned_available"
+    )
+    
+    # Shared by every CodeAgent - once Gemini keeps failing, go straight to the fallback
+    _gemini_breaker = CircuitBreaker("Gemini", fail_max=5, reset_timeout=30)
+    
+    # Exact-match cache of generated app.py in front of Gemini - unlike the SQLite
+    # cache below it also serves streamed requests and skips the disk read
+    _generation_cache = TTLCache(
+        maxsize=int(os.getenv("JARVIS_GEN_CACHE_SIZE", "128")),
+        ttl=float(os.getenv("JARVIS_GEN_CACHE_TTL", "3600"))
+    )
+    
+    # Response cache shared by every CodeAgent, created on first init
+    _llm_cache = None
+    _llm_cache_initialized = False
+    
+    # Gemini client and prompt chain shared by every CodeAgent, created on first successful init
+    _shared_gemini = None
+    
     def __init__(self):
-        print("Initializing Code Agent with dual strategy...")
+        logger.info("Initializing Code Agent with dual strategy...")
         
         # Initialize Gemini (primary agent)
         try:
-            self.llm = ChatGoogleGenerativeAI(
-                model="gemini-2.0-flash",
-                temperature=0.2,
-                google_api_key=os.getenv("GOOGLE_API_KEY"),
-                convert_system_message_to_human=True
-            )
-            print("Gemini initialized (primary)")
+            self.llm, self._gemini_chain = self._get_gemini()
+            logger.info("Gemini initialized (primary)")
             self.gemini_available = True
         except Exception as e:
-            print(f"Gemini initialization failed: {e}")
+            logger.error("Gemini initialization failed: %s", e)
+            self._gemini_chain = None
             self.gemini_available = False
         
         # Initialize your fine-tuned model (fallback) - COMMENTED OUT FOR GPU REASONS
@@ -48,69 +265,111 @@ class CodeAgent:
         self.finetuned_available = False  # Set to False when commented out
         
         # try:
-        #     print("Loading your fine-tuned model (fallback)...")
+        #     logger.info("Loading your fine-tuned model (fallback)...")
         #     self.finetuned_tokenizer = AutoTokenizer.from_pretrained("Qwen/Qwen2.5-Coder-1.5B-Instruct")
         #     if self.finetuned_tokenizer.pad_token is None:
         #         self.finetuned_tokenizer.pad_token = self.finetuned_tokenizer.eos_token
         #         
+        #     # Load in the checkpoint's own dtype (float32 doubles RAM) and quantize to int8 by default
+        #     # For int4 use BitsAndBytesConfig(load_in_4bit=True, bnb_4bit_compute_dtype=torch.bfloat16)
+        #     quantization_config = None
+        #     if os.getenv("JARVIS_FT_INT8", "1") == "1":
+        #         quantization_config = BitsAndBytesConfig(load_in_8bit=True)
+        #     
         #     base_model = AutoModelForCausalLM.from_pretrained(
         #         "Qwen/Qwen2.5-Coder-1.5B-Instruct",
-        #         torch_dtype=torch.float32
+        #         torch_dtype="auto",
+        #         device_map="auto",
+        #         quantization_config=quantization_config
         #     )
         #     
         #     self.finetuned_model = PeftModel.from_pretrained(base_model, "kunalsahjwani/qwen-streamlit-coder")
-        #     print("Your fine-tuned model loaded (fallback)")
+        #     self.finetuned_model.eval()  # inference only - no dropout
+        #     logger.info("Your fine-tuned model loaded (fallback)")
         #     self.finetuned_available = True
         # except Exception as e:
-        #     print(f" Fine-tuned model loading failed: {e}")
+        #     logger.error("Fine-tuned model loading failed: %s", e)
         #     self.finetuned_available = False
-        
-        self.project_structure = {
-            "app.py": "",
-            "requirements.txt": "",
-            "README.md": ""
-        }
+    
+    @classmethod
+    def _get_gemini(cls):
+        """
+        Build the Gemini client and prompt chain once per process.
+        Every CodeAgent reuses the same client, so its connections to Gemini are
+        kept warm instead of being re-opened (and re-handshaked) per instance.
+        """
+        if cls._shared_gemini is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            from langchain_core.prompts import ChatPromptTemplate
+            
+            llm = ChatGoogleGenerativeAI(
+                model="gemini-2.0-flash",
+                temperature=0.2,
+                max_output_tokens=_MAX_OUTPUT_TOKENS,
+                google_api_key=_GOOGLE_API_KEY,
+                # Single attempt here - retries are short and jittered in _generate_with_gemini
+                max_retries=1,
+                # Gemini 2.x takes the system message natively as system_instruction
+                # Identical app specs skip the network entirely
+                cache=cls._get_llm_cache()
+            )
+            # Prompt template built once - each call is just dict substitution
+            chain = ChatPromptTemplate.from_messages([
+                ("system", _SYSTEM_TEMPLATE),
+                ("human", _HUMAN_TEMPLATE)
+            ]) | llm
+            cls._shared_gemini = (llm, chain)
+        return cls._shared_gemini
+    
+    @classmethod
+    def _get_llm_cache(cls):
+        """
+        SQLite-backed LangChain cache for generated apps.
+        Scoped to this agent's model rather than installed globally, so chat
+        and email agents keep producing fresh responses.
+        """
+        if not cls._llm_cache_initialized:
+            cls._llm_cache_initialized = True
+            try:
+                from langchain_community.cache import SQLiteCache
+                cls._llm_cache = SQLiteCache(database_path=os.getenv("JARVIS_LLM_CACHE", ".jarvis_llm_cache.db"))
+                logger.info("LLM response cache enabled")
+            except Exception as e:
+                logger.warning("LLM response cache unavailable: %s", e)
+        return cls._llm_cache
     
     async def generate_streamlit_app(self, 
                                    app_idea: Dict[str, Any], 
-                                   user_requirements: str = "") -> Dict[str, Any]:
+                                   user_requirements: str = "",
+                                   on_token: Optional[Callable[[str], None]] = None,
+                                   on_reset: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         Generate simple, focused Streamlit app with fallback strategy
+        on_token, if given, receives each chunk of app.py as Gemini streams it
+        (Gemini only - a fine-tuned fallback result is returned in one piece)
+        on_reset, if given, is told when the chunks sent so far won't be the final app.py
         """
         try:
-            app_name = app_idea.get("name", "MyApp")
-            app_category = app_idea.get("category", "productivity")
-            app_description = app_idea.get("description", "A web application")
+            idea = AppIdea.from_dict(app_idea)
+            app_name, app_category, app_description = idea
             
-            print(f"GENERATING: {app_name} ({app_category}) - Simple functionality")
+            logger.info("GENERATING: %s (%s) - Simple functionality", app_name, app_category)
             
-            # Try Gemini first
-            main_app = None
-            model_used = None
+            # Gemini first, fine-tuned model raced in if Gemini is slow or fails
+            generation = asyncio.create_task(
+                self._generate_hedged(app_name, app_description, app_category, user_requirements, on_token, on_reset)
+            )
             
-            if self.gemini_available:
-                try:
-                    print("Trying Gemini (primary)...")
-                    main_app = await self._generate_with_gemini(app_name, app_description, app_category, user_requirements)
-                    model_used = "gemini-2.0-flash"
-                    print("Gemini generation successful!")
-                except Exception as e:
-                    print(f"Gemini failed: {e}")
-                    print("Falling back to your fine-tuned model...")
+            # Let the request go out, then prepare the parts that don't depend on the code
+            await asyncio.sleep(0)
+            requirements = self._generate_requirements(app_category)
+            next_steps = self._suggest_next_steps(app_category)
             
-            # Fallback to your fine-tuned model
-            if main_app is None and self.finetuned_available:
-                try:
-                    print("Using your fine-tuned model (fallback)...")
-                    main_app = await self._generate_with_finetuned(app_name, app_description, app_category, user_requirements)
-                    model_used = "kunalsahjwani/qwen-streamlit-coder"
-                    print("Fine-tuned model generation successful!")
-                except Exception as e:
-                    print(f"Fine-tuned model also failed: {e}")
+            main_app, model_used = await generation
             
             # Fail cleanly if both models fail
             if main_app is None:
-                print("Both Gemini and fine-tuned model failed")
+                logger.error("Both Gemini and fine-tuned model failed")
                 return {
                     "success": False,
                     "error": "Both Gemini and fine-tuned model failed to generate code",
@@ -119,72 +378,309 @@ class CodeAgent:
                     "finetuned_available": self.finetuned_available
                 }
             
-            # Simple project structure - no additional pages
-            project_files = {
-                "app.py": main_app,
-                "requirements.txt": self._generate_requirements(app_category),
-                "README.md": self._generate_readme(app_name, app_description, model_used)
-            }
-            
-            return {
-                "success": True,
-                "app_name": app_name,
-                "project_files": project_files,
-                "app_structure": self._analyze_app_structure(project_files),
-                "development_notes": self._generate_development_notes(app_idea, project_files, model_used),
-                "next_steps": self._suggest_next_steps(app_category),
-                "model_used": model_used,
-                "run_command": "streamlit run app.py"
-            }
+            return self._build_app_result(idea, main_app, model_used, requirements, next_steps)
             
         except Exception as e:
-            print(f"Error generating app: {e}")
+            logger.error("Error generating app: %s", e)
             return {"success": False, "error": str(e)}
     
-    async def _generate_with_gemini(self, app_name: str, app_description: str, app_category: str, requirements: str) -> str:
+    async def generate_streamlit_app_streaming(self,
+                                             app_idea: Dict[str, Any],
+                                             user_requirements: str = "") -> AsyncIterator[Dict[str, Any]]:
         """
-        Generate using Gemini (primary method) - Simple apps only
+        Async-iterator version of generate_streamlit_app for streaming responses
+        Yields {"type": "token", "content": chunk} while Gemini writes app.py,
+        {"type": "reset", "error": message} if Gemini fails or loses to the fallback
+        after streaming some of it, then a single {"type": "result", "result": {...}}
+        with the full project
+        """
+        # generate_streamlit_app never raises, as stream_generation requires
+        async for event in stream_generation(
+            lambda on_token, on_reset: self.generate_streamlit_app(
+                app_idea, user_requirements, on_token=on_token, on_reset=on_reset
+            )
+        ):
+            yield event
+    
+    async def generate_streamlit_apps(self,
+                                    app_ideas: List[Dict[str, Any]],
+                                    user_requirements: str = "") -> List[Dict[str, Any]]:
+        """
+        Generate several apps at once
+        All Gemini calls go out together through abatch (bounded by JARVIS_LLM_CONCURRENCY);
+        any app Gemini fails on is retried through generate_streamlit_app and its fallback
         """
-        category_features = self._get_category_features(app_category)
+        if not app_ideas:
+            return []
         
-        system_prompt = f"""
-        Generate a complete, simple Streamlit application (app.py) for a {app_category} application.
+        # Open or half-open: one batch would send every app to a backend that may still be down
+        if not self.gemini_available or not self._gemini_breaker.is_closed:
+            return list(await asyncio.gather(*[
+                self.generate_streamlit_app(app_idea, user_requirements) for app_idea in app_ideas
+            ]))
         
-        App Details:
-        - Name: {app_name}
-        - Category: {app_category}
-        - Description: {app_description}
-        - Additional Requirements: {requirements}
+        logger.info("GENERATING BATCH: %d apps", len(app_ideas))
         
-        Category-specific features to include:
-        {category_features}
+        ideas = [AppIdea.from_dict(app_idea) for app_idea in app_ideas]
+        inputs = [
+            self._prompt_inputs(idea.name, idea.description, idea.category, user_requirements)
+            for idea in ideas
+        ]
         
-        Technical Requirements:
-        1. Use modern Streamlit components (st.columns, st.tabs, st.container, etc.)
-        2. Include proper page configuration with title and icon
-        3. Add sidebar navigation if applicable
-        4. Include sample data for demonstration
-        5. Use appropriate charts/visualizations for the category
-        6. Add proper error handling
-        7. Include session state management where needed
-        8. Use st.cache_data for performance
-        9. Add helpful tooltips and descriptions
-        10. Include a professional header and footer
+        # Only apps that aren't cached go to Gemini
+        keys = [self._gemini_cache_key(i) for i in inputs]
+        codes = [self._generation_cache.get(key) for key in keys]
+        misses = [i for i, code in enumerate(codes) if code is None]
         
-        IMPORTANT: Generate a single-page app with focused functionality.
-        Make it clean, well-commented, and production-ready.
-        Focus on core features rather than complexity.
-        DO NOT include any emojis in the generated code - use plain text only.
-        """
+        batch = asyncio.create_task(self._gemini_chain.abatch(
+            [inputs[i] for i in misses],
+            config={"max_concurrency": _LLM_CONCURRENCY},
+            return_exceptions=True
+        ))
+        
+        # Per-app files that don't depend on the generated code, built while requests are in flight
+        await asyncio.sleep(0)
+        prepared = [
+            (self._generate_requirements(idea.category), self._suggest_next_steps(idea.category))
+            for idea in ideas
+        ]
+        
+        responses = await batch
+        
+        retries = []
+        for i, response in zip(misses, responses):
+            if isinstance(response, Exception):
+                logger.warning("Gemini failed for %s: %s", inputs[i]["app_name"], response)
+                self._gemini_breaker.record_failure()
+                retries.append(i)
+            else:
+                self._gemini_breaker.record_success()
+                codes[i] = self._clean_code_response(response.content)
+                self._generation_cache.set(keys[i], codes[i])
         
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=f"Create a simple, focused Streamlit app for {app_name}")
+        results = [
+            self._build_app_result(idea, code, "gemini-2.0-flash", *prepared[i]) if code is not None else None
+            for i, (idea, code) in enumerate(zip(ideas, codes))
         ]
         
-        response = await self.llm.ainvoke(messages)
+        if retries:
+            retried = await asyncio.gather(*[
+                self.generate_streamlit_app(app_ideas[i], user_requirements) for i in retries
+            ])
+            for i, result in zip(retries, retried):
+                results[i] = result
+        
+        return results
+    
+    def _build_app_result(self, idea: AppIdea, main_app: str, model_used: str,
+                          requirements: Optional[str] = None,
+                          next_steps: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+        """
+        Wrap generated app.py into the full project response
+        requirements / next_steps can be passed in if they were built ahead of time
+        """
+        app_name, app_category, app_description = idea
+        
+        if requirements is None:
+            requirements = self._generate_requirements(app_category)
+        if next_steps is None:
+            next_steps = self._suggest_next_steps(app_category)
+        
+        # Simple project structure - no additional pages
+        project_files = {
+            "app.py": main_app,
+            "requirements.txt": requirements,
+            "README.md": self._generate_readme(app_name, app_description, model_used)
+        }
+        
+        return {
+            "success": True,
+            "app_name": app_name,
+            "project_files": project_files,
+            "app_structure": self._analyze_app_structure(project_files),
+            "development_notes": self._generate_development_notes(idea, project_files, model_used),
+            "next_steps": next_steps,
+            "model_used": model_used,
+            "run_command": "streamlit run app.py"
+        }
+    
+    async def _generate_hedged(self, app_name: str, app_description: str, app_category: str, requirements: str,
+                               on_token: Optional[Callable[[str], None]] = None,
+                               on_reset: Optional[Callable[[str], None]] = None):
+        """
+        Race Gemini against the fine-tuned fallback.
+        The fallback only starts once Gemini fails or exceeds the hedge delay;
+        whichever succeeds first wins and the other task is cancelled.
+        If Gemini already streamed chunks and then fails or loses, on_reset voids them.
+        Returns (code, model_used) or (None, None) if every provider failed.
+        """
+        args = (app_name, app_description, app_category, requirements)
+        providers = {}
+        pending = set()
+        fallback_started = not self.finetuned_available
+        streamed = False
+        
+        def gemini_token(chunk: str):
+            nonlocal streamed
+            streamed = True
+            on_token(chunk)
+        
+        def reset_stream(error: str):
+            nonlocal streamed
+            if streamed and on_reset is not None:
+                on_reset(error)
+            streamed = False
+        
+        def start_fallback():
+            logger.info("Using your fine-tuned model (fallback)...")
+            task = asyncio.create_task(self._generate_with_finetuned(*args))
+            providers[task] = "kunalsahjwani/qwen-streamlit-coder"
+            pending.add(task)
+        
+        gemini_task = None
+        # No breaker check here - _generate_with_gemini serves cached specs even while
+        # it is open, and fails fast through allow_request otherwise
+        if self.gemini_available:
+            logger.info("Trying Gemini (primary)...")
+            gemini_task = asyncio.create_task(self._generate_with_gemini(
+                *args, on_token=gemini_token if on_token is not None else None
+            ))
+            providers[gemini_task] = "gemini-2.0-flash"
+            pending.add(gemini_task)
+        
+        try:
+            while True:
+                if not pending and not fallback_started:
+                    start_fallback()
+                    fallback_started = True
+                if not pending:
+                    return None, None
+                
+                done, still_pending = await asyncio.wait(
+                    pending,
+                    timeout=None if fallback_started else _HEDGE_DELAY_SECONDS,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                pending.clear()
+                pending.update(still_pending)
+                
+                for task in done:
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        logger.warning("%s failed: %s", providers[task], e)
+                        if task is gemini_task:
+                            reset_stream(str(e))
+                        continue
+                    if task is not gemini_task:
+                        # Fallback won while Gemini was mid-stream - its chunks are void
+                        reset_stream("Gemini lost the race to the fine-tuned model")
+                    logger.info("%s generation successful!", providers[task])
+                    return result, providers[task]
+                
+                # Gemini is still running past the hedge delay - start the fallback alongside it
+                if not done and not fallback_started:
+                    logger.warning("Gemini is slow, racing the fine-tuned model...")
+                    start_fallback()
+                    fallback_started = True
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _generate_with_gemini(self, app_name: str, app_description: str, app_category: str, requirements: str,
+                                    on_token: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Generate using Gemini (primary method) - Simple apps only
+        With on_token the response is streamed chunk by chunk; without it we use
+        a plain ainvoke so repeated specs are served from the response cache
+        Transient errors are retried with jittered backoff, every outcome feeds the circuit breaker
+        """
+        prompt_inputs = self._prompt_inputs(app_name, app_description, app_category, requirements)
+        
+        cache_key = self._gemini_cache_key(prompt_inputs)
+        code = self._generation_cache.get(cache_key)
+        if code is not None:
+            logger.info("Gemini response served from cache")
+            if on_token is not None:
+                on_token(code)
+            return code
+        
+        # While half-open only the one caller that claims the trial gets through
+        if not self._gemini_breaker.allow_request():
+            raise RuntimeError("Gemini circuit breaker is open")
+        
+        try:
+            if on_token is None:
+                code = self._clean_code_response(await self._ainvoke_with_retry(prompt_inputs))
+            else:
+                # No retry once streaming - tokens already handed to on_token can't be taken back
+                chunks = []
+                async with asyncio.timeout(_GEMINI_TIMEOUT_SECONDS):
+                    async for chunk in self._stream_gemini(prompt_inputs):
+                        chunks.append(chunk)
+                        on_token(chunk)
+                code = self._clean_code_response("".join(chunks))
+        except asyncio.CancelledError:
+            # Lost the race to the fallback - no verdict on Gemini, let the next caller try
+            self._gemini_breaker.release_trial()
+            raise
+        except Exception:
+            self._gemini_breaker.record_failure()
+            raise
+        
+        self._gemini_breaker.record_success()
+        self._generation_cache.set(cache_key, code)
+        return code
+    
+    async def _ainvoke_with_retry(self, prompt_inputs: Dict[str, str]) -> str:
+        """
+        ainvoke with a per-attempt timeout, retrying timeouts and transient API errors
+        with short jittered backoff
+        """
+        async for attempt in AsyncRetrying(
+            retry=retry_if_exception_type(_transient_gemini_errors()),
+            wait=wait_exponential_jitter(initial=0.2, max=2.0),
+            stop=stop_after_attempt(_GEMINI_RETRY_ATTEMPTS),
+            reraise=True
+        ):
+            with attempt:
+                response = await asyncio.wait_for(self._gemini_chain.ainvoke(prompt_inputs), _GEMINI_TIMEOUT_SECONDS)
         return response.content
     
+    async def _stream_gemini(self, prompt_inputs: Dict[str, str]) -> AsyncIterator[str]:
+        """
+        Stream app.py from Gemini chunk by chunk
+        """
+        async for chunk in self._gemini_chain.astream(prompt_inputs):
+            if chunk.content:
+                yield chunk.content
+    
+    @staticmethod
+    def _clean_code_response(code: str) -> str:
+        """
+        Strip a leading/trailing markdown fence from generated code
+        """
+        return _FENCE_RE.sub("", code).strip()
+    
+    @staticmethod
+    def _gemini_cache_key(prompt_inputs: Dict[str, str]) -> str:
+        """
+        Exact-match cache key for a Gemini generation
+        """
+        return make_cache_key("gemini-2.0-flash", prompt_inputs)
+    
+    def _prompt_inputs(self, app_name: str, app_description: str, app_category: str, requirements: str) -> Dict[str, str]:
+        """
+        Values for the Gemini prompt template
+        """
+        return {
+            "app_name": app_name,
+            "app_category": app_category,
+            "app_description": app_description,
+            "requirements": requirements,
+            "category_features": _CATEGORY_FEATURES.get(app_category.lower(), _DEFAULT_FEATURES)
+        }
+    
     async def _generate_with_finetuned(self, app_name: str, app_description: str, app_category: str, requirements: str) -> str:
         """
         Generate using your fine-tuned model (fallback method) - COMMENTED OUT
@@ -202,14 +698,16 @@ class CodeAgent:
         # 
         # # App functionality"""
         # 
-        # inputs = self.finetuned_tokenizer(prompt, return_tensors="pt")
+        # inputs = self.finetuned_tokenizer(prompt, return_tensors="pt", padding=False, truncation=True, max_length=512)
         # 
-        # with torch.no_grad():
+        # # Greedy decoding with the KV cache - each new token reuses past attention instead of recomputing it
+        # with torch.inference_mode():
         #     output = self.finetuned_model.generate(
         #         **inputs,
         #         max_new_tokens=400,
-        #         temperature=0.3,
-        #         do_sample=True,
+        #         do_sample=False,
+        #         num_beams=1,
+        #         use_cache=True,
         #         pad_token_id=self.finetuned_tokenizer.eos_token_id
         #     )
         # 
@@ -221,120 +719,39 @@ class CodeAgent:
     
     def _get_category_features(self, category: str) -> str:
         """Get simple, focused features based on app category"""
-        features = {
-            "finance": "- Financial dashboard with key metrics\n- Simple budget tracking\n- Basic financial calculator\n- Interactive charts",
-            "healthcare": "- Health metrics display\n- Simple progress tracking\n- BMI calculator\n- Basic health visualizations",
-            "education": "- Simple course browser\n- Basic progress tracking\n- Interactive quiz component\n- Learning dashboard",
-            "entertainment": "- Content display interface\n- Simple rating system\n- Basic recommendations\n- User-friendly navigation",
-            "travel": "- Destination browser\n- Simple trip information\n- Basic budget calculator\n- Photo gallery",
-            "food": "- Recipe browser\n- Simple meal planner\n- Basic nutrition info\n- Cooking timer",
-            "productivity": "- Task management interface\n- Simple progress tracking\n- Basic analytics\n- User-friendly dashboard"
-        }
-        
-        return features.get(category.lower(), "- Simple interactive dashboard\n- Basic data visualization\n- User input forms\n- Core functionality")
+        return _CATEGORY_FEATURES.get(category.lower(), _DEFAULT_FEATURES)
     
     def _generate_requirements(self, app_category: str) -> str:
         """Generate simple requirements.txt based on app needs"""
-        base_requirements = [
-            "streamlit>=1.28.0",
-            "pandas>=1.5.0",
-            "numpy>=1.24.0",
-            "plotly>=5.15.0"
-        ]
-        
-        category_requirements = {
-            "finance": ["yfinance"],
-            "healthcare": ["scikit-learn"],
-            "education": ["matplotlib"],
-            "entertainment": ["requests"],
-            "travel": ["folium"],
-            "food": ["requests"]
-        }
-        
-        all_requirements = base_requirements + category_requirements.get(app_category, [])
-        return "\n".join(all_requirements)
+        return _REQS_BY_CATEGORY.get(app_category, _DEFAULT_REQS)
     
-    def _generate_development_notes(self, app_idea: Dict[str, Any], project_files: Dict[str, str], model_used: str) -> List[str]:
+    def _generate_development_notes(self, idea: AppIdea, project_files: Dict[str, str], model_used: str) -> Tuple[str, ...]:
         """Generate development notes and recommendations"""
-        notes = [
+        return (
             f"Generated by: {model_used}",
-            f"App: {app_idea.get('name', 'your app')} ({app_idea.get('category', 'general')})",
+            f"App: {idea.name} ({idea.category})",
             f"Files: {len(project_files)}",
-            "Simple, focused functionality",
-            "Run 'pip install -r requirements.txt' to install dependencies",
-            "Run 'streamlit run app.py' to start the app",
-            "App will open in your browser at http://localhost:8501",
-            "Customize the app by editing app.py",
-            "Add your own data sources and APIs"
-        ]
-        
-        return notes
+            *_STATIC_NOTES
+        )
     
-    def _suggest_next_steps(self, app_category: str) -> List[str]:
+    def _suggest_next_steps(self, app_category: str) -> Tuple[str, ...]:
         """Suggest next development steps for simple apps"""
-        base_steps = [
-            "1. Test the app locally with 'streamlit run app.py'",
-            "2. Customize the UI colors and themes",
-            "3. Replace sample data with real data sources",
-            "4. Add your own branding and styling"
-        ]
-        
-        category_steps = {
-            "finance": ["5. Connect to financial APIs", "6. Add real-time data updates"],
-            "healthcare": ["5. Ensure data privacy compliance", "6. Add data validation"],
-            "education": ["5. Add user progress tracking", "6. Implement content management"],
-            "entertainment": ["5. Add content recommendation", "6. Implement user ratings"]
-        }
-        
-        steps = base_steps + category_steps.get(app_category, ["5. Add category-specific features"])
-        steps.append("6. Deploy to Streamlit Cloud")
-        
-        return steps
+        # Cached per category - a tuple, so it can be handed out without copying
+        return _next_steps_for(app_category)
     
     def _generate_readme(self, app_name: str, app_description: str, model_used: str) -> str:
         """Generate README with model info"""
-        return f"""# {app_name}
-
-{app_description}
-
-## Generated by Steve Connect
-- **Primary Model**: Google Gemini 2.0 Flash
-- **Fallback Model**: kunalsahjwani/qwen-streamlit-coder  
-- **Model Used**: {model_used}
-- **App Type**: Simple, focused functionality
-
-## Installation
-```bash
-pip install -r requirements.txt
-streamlit run app.py
-```
-
-## Features
-- Simple, focused functionality
-- Interactive web interface
-- Real-time data visualization
-- Modern UI components
-- Responsive design
-
-## Customization
-- Edit app.py to modify functionality
-- Update requirements.txt for additional dependencies
-- Customize styling and themes
-- Add your own data sources
-
-## Deployment
-Deploy to Streamlit Cloud:
-1. Push to GitHub
-2. Connect to Streamlit Cloud
-3. Deploy with one click!
-"""
+        return _render_readme(app_name, app_description, model_used)
     
     def _analyze_app_structure(self, project_files: Dict[str, str]) -> Dict[str, Any]:
         """Analyze the generated app structure"""
+        line_count, emoji_violations = count_lines_and_emoji(project_files.get("app.py", ""))
         return {
             "total_files": len(project_files),
-            "python_files": len([f for f in project_files.keys() if f.endswith('.py')]),
+            "python_files": sum(1 for f in project_files if f.endswith('.py')),
             "app_type": "simple",
             "has_requirements": "requirements.txt" in project_files,
-            "has_readme": "README.md" in project_files
+            "has_readme": "README.md" in project_files,
+            "line_count": line_count,
+            "emoji_violations": emoji_violations
         }
\ No newline at end of file
@@ -7,50 +7,158 @@ Uses Gemini Pro for intelligent email content generation
 
 import os
 import re
-from typing import Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
+import asyncio
+from typing import Dict, Any, Optional, Callable, AsyncIterator
 from langchain.schema import SystemMessage, HumanMessage
 from dotenv import load_dotenv
 from src.agents.email_sender import EmailSender
+from src.utils.ttl_cache import TTLCache
+from src.utils.llm import get_chat_llm
+from src.utils.streaming import stream_generation
+from src.utils.logger import get_logger
 
 load_dotenv()
 
+logger = get_logger("email_agent")
+
+# Instructional phrases the LLM sometimes wraps the subject line in - compiled once at import
+# Applied one after another (each pass sees the previous pass's output), so they stay separate
+_INSTRUCTIONAL_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r"here's?\s+a?\s+compelling\s+subject\s+line.*?:?\s*",
+    r"a?\s+good\s+subject\s+line\s+would\s+be.*?:?\s*",
+    r"subject\s+line.*?:?\s*",
+    r"here's?\s+.*?:?\s*",
+    r"^.*?:\s*",  # Remove anything before a colon
+))
+
+# Phrases that mark a line as instructions rather than an actual subject line -
+# one alternation so the text is scanned once instead of once per phrase
+_INSTRUCTIONAL_TEXT_RE = re.compile("|".join(map(re.escape, (
+    'here\'s', 'heres', 'compelling', 'subject line',
+    'good subject', 'would be', 'how about', 'try this',
+    'example', 'suggestion', 'option'
+))), re.IGNORECASE)
+
+# System prompts are static so every request shares the same prompt prefix
+# (Gemini's implicit prefix caching) - the per-app details go in the human message
+_SUBJECT_SYSTEM_PROMPT = """You are an expert email marketer. Generate ONLY a compelling email subject line
+for the app described in the user message.
+
+CRITICAL INSTRUCTIONS:
+- Return ONLY the subject line text, nothing else
+- NO explanatory text like "Here's a compelling subject line"
+- NO quotation marks
+- NO introductory phrases
+- Just the actual subject line that would appear in an email
+- Keep under 50 characters for mobile optimization
+- Make it action-oriented and benefit-focused
+- Create urgency or curiosity without being spammy
+- Avoid spam trigger words (FREE, URGENT, !!!)
+
+Example good responses:
+"Launch Your Dream App Today"
+"Stop Wasting Time - Try TaskMaster Now"
+"Your Perfect Workout Buddy is Here"
+
+Example BAD responses:
+"Here's a compelling subject line for your app:"
+"A good subject line would be:"
+"""
+
+_BODY_SYSTEM_PROMPT = """Generate a compelling email body for the email campaign described in the user message.
+
+Email Structure:
+1. Personal greeting
+2. Hook - capture attention immediately
+3. Problem/Solution - what problem does the app solve?
+4. Key benefits (3-4 bullet points)
+5. Clear next steps
+6. Professional closing
+
+Writing Guidelines:
+- Use conversational, friendly tone
+- Keep paragraphs short (2-3 sentences max)
+- Focus on benefits, not just features
+- Make it scannable with bullet points
+- Keep total length under 200 words
+
+Generate engaging, persuasive email body content."""
+
+_SUBJECT_HUMAN_TEMPLATE = """Generate subject line for {app_name} {email_type} email
+
+App Details:
+- Name: {app_name}
+- Category: {app_category}
+- Email Type: {email_type}"""
+
+_BODY_HUMAN_TEMPLATE = """Create {email_type} email body for {app_name} targeting {target_audience}
+
+App Details:
+- Name: {app_name}
+- Category: {app_category}
+- Description: {app_description}
+- Target Audience: {target_audience}"""
+
+# Paragraph break, line break or "• item" line - the whole body is converted in one pass
+_BODY_MARKUP_RE = re.compile(r'(\n\n)|\n|• ([^\n]*)')
+_PARAGRAPH_BREAK = '</p><p style="margin-bottom: 15px;">'
+
+
+def _body_markup(match: re.Match) -> str:
+    if match.group(1):
+        return _PARAGRAPH_BREAK
+    item = match.group(2)
+    if item is not None:
+        return f'<li style="margin-bottom: 8px;">{item}</li>'
+    return '<br>'
+
+
 class EmailAgent:
     """
     AI agent for generating marketing emails and launch campaigns
     """
     
+    # Subject lines depend only on (app_name, app_category, email_type) - shared by every
+    # EmailAgent so a repeat launch email skips that LLM round-trip
+    _subject_cache = TTLCache(
+        maxsize=int(os.getenv("JARVIS_SUBJECT_CACHE_SIZE", "1024")),
+        ttl=float(os.getenv("JARVIS_SUBJECT_CACHE_TTL", "3600"))
+    )
+    
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            temperature=0.4,
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            convert_system_message_to_human=True
-        )
+        self.llm = get_chat_llm(temperature=0.4)
         
         self.email_sender = EmailSender()
-        print("EmailAgent initialized with mcp gmail integration")
+        logger.info("EmailAgent initialized with mcp gmail integration")
     
     async def generate_launch_email(self, 
                                   app_context: Dict[str, Any], 
                                   target_audience: str = "general",
-                                  email_type: str = "launch") -> Dict[str, Any]:
+                                  email_type: str = "launch",
+                                  on_token: Optional[Callable[[str], None]] = None,
+                                  on_reset: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         Generate a complete marketing email for app launch
+        on_token, if given, receives each chunk of the email body as Gemini streams it;
+        on_reset is told when the chunks sent so far are replaced by the fallback body
         """
         try:
             app_name = app_context.get("app_name", "Your New App")
             app_category = app_context.get("app_category", "productivity")
             app_description = app_context.get("app_description", "An amazing application")
             
-            print(f"Generating {email_type} email for {app_name}")
+            logger.info("Generating %s email for %s", email_type, app_name)
             
             # Generate email components using generate subject line and generate email body
-            subject_line = await self._generate_subject_line(app_name, app_category, email_type)
-            email_body = await self._generate_email_body(app_context, target_audience, email_type)
+            # Both calls are independent, so they run concurrently (each falls back on its own error)
+            subject_line, email_body = await asyncio.gather(
+                self._generate_subject_line(app_name, app_category, email_type),
+                self._generate_email_body(app_name, app_category, app_description,
+                                          target_audience, email_type, on_token, on_reset)
+            )
             
             # Compile the complete email qith the subject line
-            complete_email = self._compile_email(subject_line, email_body, app_context)
+            complete_email = self._compile_email(subject_line, email_body, app_name)
             
             return {
                 "success": True,
@@ -63,50 +171,49 @@ class EmailAgent:
             }
             
         except Exception as e:
-            print(f"Error generating launch email: {e}")
+            logger.error("Error generating launch email: %s", e)
             return {
                 "success": False,
                 "error": str(e),
                 "app_name": app_context.get("app_name", "Unknown")
             }
+    
+    async def generate_launch_email_streaming(self,
+                                            app_context: Dict[str, Any],
+                                            target_audience: str = "general",
+                                            email_type: str = "launch") -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async-iterator version of generate_launch_email for streaming responses
+        Yields {"type": "token", "content": chunk} while Gemini writes the body,
+        {"type": "reset", "error": ...} if the stream broke and the fallback body follows,
+        then a single {"type": "result", "result": {...}} with the complete email
+        """
+        # generate_launch_email never raises, as stream_generation requires
+        async for event in stream_generation(
+            lambda on_token, on_reset: self.generate_launch_email(
+                app_context, target_audience, email_type, on_token=on_token, on_reset=on_reset
+            )
+        ):
+            yield event
+    
                 #generating subject line by using enhanced clean prompts
     async def _generate_subject_line(self, app_name: str, app_category: str, email_type: str) -> str:
         """
         Generate compelling subject line for the email
         """
+        # Category and email type are free-form labels - normalize them so "Finance"
+        # and "finance " share an entry; the name keeps its case since it appears in the subject
+        cache_key = (app_name.strip(), app_category.strip().lower(), email_type.strip().lower())
+        cached_subject = self._subject_cache.get(cache_key)
+        if cached_subject is not None:
+            return cached_subject
+        
         try:
-            system_prompt = f"""
-            You are an expert email marketer. Generate ONLY a compelling email subject line.
-            
-            App Details:
-            - Name: {app_name}
-            - Category: {app_category}
-            - Email Type: {email_type}
-            
-            CRITICAL INSTRUCTIONS:
-            - Return ONLY the subject line text, nothing else
-            - NO explanatory text like "Here's a compelling subject line"
-            - NO quotation marks
-            - NO introductory phrases
-            - Just the actual subject line that would appear in an email
-            - Keep under 50 characters for mobile optimization
-            - Make it action-oriented and benefit-focused
-            - Create urgency or curiosity without being spammy
-            - Avoid spam trigger words (FREE, URGENT, !!!)
-            
-            Example good responses:
-            "Launch Your Dream App Today"
-            "Stop Wasting Time - Try TaskMaster Now"
-            "Your Perfect Workout Buddy is Here"
-            
-            Example BAD responses:
-            "Here's a compelling subject line for your app:"
-            "A good subject line would be:"
-            """
-            
             messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=f"Generate subject line for {app_name} {email_type} email")
+                SystemMessage(content=_SUBJECT_SYSTEM_PROMPT),
+                HumanMessage(content=_SUBJECT_HUMAN_TEMPLATE.format(
+                    app_name=app_name, app_category=app_category, email_type=email_type
+                ))
             ]
             
             response = await self.llm.ainvoke(messages)
@@ -125,10 +232,11 @@ class EmailAgent:
                 if len(subject_line) > 50:
                     subject_line = f"Try {app_name} Today"
             
+            self._subject_cache.set(cache_key, subject_line)
             return subject_line
             
         except Exception as e:
-            print(f"Error generating subject line: {e}")
+            logger.error("Error generating subject line: %s", e)
             return f"Introducing {app_name}"
     
     def _clean_subject_line(self, raw_subject: str) -> str:
@@ -136,17 +244,9 @@ class EmailAgent:
         Clean the subject line of any instructional text
         """
         # Remove common instructional phrases
-        instructional_patterns = [
-            r"here's?\s+a?\s+compelling\s+subject\s+line.*?:?\s*",
-            r"a?\s+good\s+subject\s+line\s+would\s+be.*?:?\s*",
-            r"subject\s+line.*?:?\s*",
-            r"here's?\s+.*?:?\s*",
-            r"^.*?:\s*",  # Remove anything before a colon
-        ]
-        
         cleaned = raw_subject
-        for pattern in instructional_patterns:
-            cleaned = re.sub(pattern, "", cleaned, flags=re.IGNORECASE)
+        for pattern in _INSTRUCTIONAL_PATTERNS:
+            cleaned = pattern.sub("", cleaned)
         
         # Remove quotes and extra whitespace (just some processing to display clean data)
         cleaned = cleaned.strip().replace('"', '').replace("'", "")
@@ -165,78 +265,61 @@ class EmailAgent:
         """
         Check if text contains instructional phrases
         """
-        instructional_words = [
-            'here\'s', 'heres', 'compelling', 'subject line', 
-            'good subject', 'would be', 'how about', 'try this',
-            'example', 'suggestion', 'option'
-        ]
-        
-        text_lower = text.lower()
-        return any(word in text_lower for word in instructional_words)
+        return _INSTRUCTIONAL_TEXT_RE.search(text) is not None
     # email body function to generate the actual email body using system and user prompt
-    async def _generate_email_body(self, app_context: Dict[str, Any], target_audience: str, email_type: str) -> str:
+    async def _generate_email_body(self, app_name: str, app_category: str, app_description: str,
+                                   target_audience: str, email_type: str,
+                                   on_token: Optional[Callable[[str], None]] = None,
+                                   on_reset: Optional[Callable[[str], None]] = None) -> str:
         """
         Generate the main email body content
+        The app fields are the ones the caller already read from app_context
+        With on_token the response is streamed and each chunk is handed over as it arrives;
+        if the stream breaks, on_reset voids the chunks sent so far and the fallback body
+        is streamed in their place, so the streamed text always matches the returned body
         """
+        parts = []
         try:
-            app_name = app_context.get("app_name", "Your App")
-            app_category = app_context.get("app_category", "productivity")
-            app_description = app_context.get("app_description", "An amazing application")
-            
-            system_prompt = f"""
-            Generate a compelling email body for a {email_type} email campaign.
-            
-            App Details:
-            - Name: {app_name}
-            - Category: {app_category}
-            - Description: {app_description}
-            - Target Audience: {target_audience}
-            
-            Email Structure:
-            1. Personal greeting
-            2. Hook - capture attention immediately
-            3. Problem/Solution - what problem does the app solve?
-            4. Key benefits (3-4 bullet points)
-            5. Clear next steps
-            6. Professional closing
-            
-            Writing Guidelines:
-            - Use conversational, friendly tone
-            - Keep paragraphs short (2-3 sentences max)
-            - Focus on benefits, not just features
-            - Make it scannable with bullet points
-            - Keep total length under 200 words
-            
-            Generate engaging, persuasive email body content.
-            """
-            
             messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=f"Create email body for {app_name} targeting {target_audience}")
+                SystemMessage(content=_BODY_SYSTEM_PROMPT),
+                HumanMessage(content=_BODY_HUMAN_TEMPLATE.format(
+                    app_name=app_name, app_category=app_category,
+                    app_description=app_description, target_audience=target_audience,
+                    email_type=email_type
+                ))
             ]
             
-            response = await self.llm.ainvoke(messages)
-            return response.content.strip()
+            if on_token is None:
+                response = await self.llm.ainvoke(messages)
+                return response.content.strip()
+            
+            async for chunk in self.llm.astream(messages):
+                parts.append(chunk.content)
+                on_token(chunk.content)
+            return "".join(parts).strip()
             
         except Exception as e:
-            print(f"Error generating email body: {e}")
-            return f"""
+            logger.error("Error generating email body: %s", e)
+            fallback_body = f"""
 Hi there!
 
-We're excited to introduce {app_context.get("app_name", "Your App")}, our new solution designed to make your life easier.
+We're excited to introduce {app_name}, our new solution designed to make your life easier.
 
 Ready to get started?
 
 Best regards,
 The Team
 """
+            if on_token is not None:
+                if parts and on_reset is not None:
+                    on_reset(str(e))
+                on_token(fallback_body)
+            return fallback_body
     # compile email makes it look good when displaying, shows clean design of the email, have good alignment rather than plain text given by the llm
-    def _compile_email(self, subject: str, body: str, app_context: Dict[str, Any]) -> str:
+    def _compile_email(self, subject: str, body: str, app_name: str) -> str:
         """
         Compile the complete email with HTML formatting
         """
-        app_name = app_context.get("app_name", "Your App")
-        
         html_email = f"""
 <!DOCTYPE html>
 <html>
@@ -280,15 +363,17 @@ The Team
         """
         Format email body with HTML styling
         """
-        # Convert line breaks to HTML
-        formatted_body = body.replace('\n\n', '</p><p style="margin-bottom: 15px;">')
-        formatted_body = formatted_body.replace('\n', '<br>')
+        if '• ' in body:
+            # Line breaks and bullet points converted in a single regex pass
+            formatted_body = _BODY_MARKUP_RE.sub(_body_markup, body)
+        else:
+            # No bullets - two C-level replaces beat a per-match Python callback
+            formatted_body = body.replace('\n\n', _PARAGRAPH_BREAK).replace('\n', '<br>')
         
         # Wrap in paragraph tags
         formatted_body = f'<p style="margin-bottom: 15px;">{formatted_body}</p>'
         
-        # Style bullet points if present
-        formatted_body = re.sub(r'• (.*?)(?=<br>|</p>)', r'<li style="margin-bottom: 8px;">\1</li>', formatted_body)
+        # Wrap bullet points in a list if present
         if '<li' in formatted_body:
             formatted_body = f'<ul style="padding-left: 20px;">{formatted_body}</ul>'
         
@@ -6,13 +6,20 @@ uses mcp server from the famous marketplace glama
 """
 
 import os
-import shutil
-from typing import Dict, Any, Optional
-from src.mcp.gmail_mcp_client import GmailMCPClient
+import re
+import asyncio
+from typing import Dict, Any, Optional, List
+from src.mcp.gmail_mcp_client import GmailMCPClient, NPX_PATH
+from src.utils.logger import get_logger
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = get_logger("email_sender")
+
+# Basic address shape (local@domain.tld, no spaces) - compiled once at import
+_EMAIL_RE = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+
 class EmailSender:
     """
     Email sender with enhanced MCP Gmail integration
@@ -20,15 +27,15 @@ class EmailSender:
     
     def __init__(self):
         # Check if npx is available
-        self.npx_path = shutil.which("npx")
+        self.npx_path = NPX_PATH
         if self.npx_path:
-            self.mcp_client = GmailMCPClient()
+            self.mcp_client = GmailMCPClient.get_shared()
             # CHANGE: Updated initialization message to reflect automatic token refresh
-            print(f"EmailSender initialized with automatic token refresh (npx: {self.npx_path})")
-            print("No more manual token management needed!")
+            logger.info("EmailSender initialized with automatic token refresh (npx: %s)", self.npx_path)
+            logger.info("No more manual token management needed!")
         else:
             self.mcp_client = None
-            print("EmailSender initialized - WARNING: npx not found, MCP disabled")
+            logger.warning("EmailSender initialized - npx not found, MCP disabled")
         
         self.is_connected = False
     
@@ -41,6 +48,10 @@ class EmailSender:
         Send email via MCP Gmail integration with automatic token refresh
         """
         try:
+            # Addresses pasted into the frontend often carry stray spaces/newlines
+            if isinstance(recipient_email, str):
+                recipient_email = recipient_email.strip()
+            
             # Validation first
             if not self._validate_email_data(recipient_email, subject, email_body):
                 return {"success": False, "error": "Invalid email data"}
@@ -48,9 +59,9 @@ class EmailSender:
             if not self.mcp_client:
                 return {"success": False, "error": "MCP not available (npx not found)"}
             
-            # CHANGE: Updated logging to reflect automatic token management, just using print statements for now
-            print(f"Sending email: '{subject}' to {recipient_email}")
-            print("Automatic token management enabled...")
+            # CHANGE: Updated logging to reflect automatic token management
+            logger.info("Sending email: '%s' to %s", subject, recipient_email)
+            logger.info("Automatic token management enabled...")
             
             # Send via enhanced MCP Gmail client (handles token refresh automatically good for rate limits set by google to not use oauth.py again and again)
             result = await self.mcp_client.send_email(
@@ -61,7 +72,7 @@ class EmailSender:
             )
             
             if result["success"]:
-                print(f"Email sent successfully!")
+                logger.info("Email sent successfully!")
                 return {
                     "success": True,
                     "message_id": result["message_id"],
@@ -71,7 +82,7 @@ class EmailSender:
                     "mcp_tool": result.get("mcp_tool", "gmail_send_email")
                 }
             else:
-                print(f"Email send failed: {result.get('error')}")
+                logger.error("Email send failed: %s", result.get('error'))
                 
                 # handling for reauth requirement
                 if result.get("requires_reauth"):
@@ -84,20 +95,48 @@ class EmailSender:
                     return result
             
         except Exception as e:
-            print(f"Email sending error: {e}")
+            logger.error("Email sending error: %s", e)
             return {
                 "success": False,
                 "error": str(e),
                 "recipient": recipient_email
             }
     
+    async def send_emails_batch(self,
+                                emails: List[Dict[str, Any]],
+                                max_concurrency: int = 5) -> List[Dict[str, Any]]:
+        """
+        Send several emails concurrently over the shared MCP session
+        Each item holds send_email's arguments (recipient_email, subject, email_body,
+        optionally sender_name); at most max_concurrency sends are in flight at once
+        to stay inside Gmail's rate limits. Results come back in input order.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def send_one(email: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.send_email(**email)
+        
+        results = await asyncio.gather(*[send_one(email) for email in emails], return_exceptions=True)
+        return [
+            {"success": False, "error": str(result), "recipient": email.get("recipient_email")}
+            if isinstance(result, BaseException) else result
+            for email, result in zip(emails, results)
+        ]
+    
+    async def aclose(self):
+        """Close the persistent MCP Gmail session (stops the npx server process)"""
+        if self.mcp_client:
+            await self.mcp_client.aclose()
+    
     def _validate_email_data(self, recipient: str, subject: str, body: str) -> bool:
         """Validate email data before sending"""
-        if not recipient or "@" not in recipient:
+        # isspace() checks for blank text without building stripped copies
+        if not recipient or _EMAIL_RE.fullmatch(recipient) is None:
             return False
-        if not subject or len(subject.strip()) == 0:
+        if not subject or subject.isspace():
             return False
-        if not body or len(body.strip()) == 0:
+        if not body or body.isspace():
             return False
         return True
     
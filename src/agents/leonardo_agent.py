@@ -5,35 +5,158 @@ Enhanced with better prompts using prompt engineering techniques
 """
 
 import os
+import io
+import re
 import base64
-from typing import Dict, Any
-from google import genai
+import asyncio
+from types import MappingProxyType
+from typing import Dict, Any, Mapping
 from google.genai import types
-from langchain_google_genai import ChatGoogleGenerativeAI
+from PIL import Image
 from langchain.schema import SystemMessage, HumanMessage
 from dotenv import load_dotenv
+from src.utils.ttl_cache import TTLCache, make_cache_key
+from src.utils.llm import get_chat_llm, get_genai_client
+from src.utils.logger import get_logger
 
 load_dotenv()
 
+logger = get_logger("leonardo_agent")
+
+# Structural prompt reuse (opt-in) - apps in the same category get near-identical enhanced
+# prompts apart from their name/description, so a prompt written for one app is re-filled
+# for the next instead of asking the LLM again. Trades some prompt variety for latency.
+_REUSE_PROMPT_TEMPLATES = os.getenv("JARVIS_IMAGE_PROMPT_TEMPLATES", "0") == "1"
+_NAME_SLOT = "\x00app_name\x00"
+_DESCRIPTION_SLOT = "\x00description\x00"
+
+# Gemini returns photo-style PNGs; re-encoding them as WebP makes the response several times
+# smaller (and the base64 step cheaper). JARVIS_IMAGE_FORMAT=original keeps Gemini's bytes
+_IMAGE_FORMAT = os.getenv("JARVIS_IMAGE_FORMAT", "webp").lower()
+_WEBP_QUALITY = int(os.getenv("JARVIS_IMAGE_WEBP_QUALITY", "80"))
+
+_IMAGE_MODEL = "gemini-2.0-flash-preview-image-generation"
+# Writing the image prompt is fill-in-the-structure work, so a lighter model than the chat
+# agents' does it faster; JARVIS_IMAGE_PROMPT_MODEL=gemini-2.0-flash restores the old model
+_PROMPT_MODEL = os.getenv("JARVIS_IMAGE_PROMPT_MODEL", "gemini-2.0-flash-lite")
+
+
+def _encode_webp(data: bytes) -> bytes:
+    """Re-encode image bytes as WebP (CPU-bound - run it off the event loop)"""
+    buffer = io.BytesIO()
+    with Image.open(io.BytesIO(data)) as img:
+        img.save(buffer, format="WEBP", quality=_WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+def image_to_base64(image_bytes: bytes) -> str:
+    """Base64 text for JSON responses / data: URLs"""
+    return base64.b64encode(image_bytes).decode('ascii')
+
+# The prompt-writing instructions are static so every request shares the same prompt prefix
+# (Gemini's implicit prefix caching) - the per-app details go in the human message
+_SMART_PROMPT_SYSTEM = """Create a detailed, specific image prompt for the image described in the user message.
+
+Create a prompt that will generate a realistic, professional image showing:
+
+For FITNESS/HEALTHCARE apps:
+- Person using/wearing the fitness device
+- Modern gym or outdoor setting
+- Professional product photography style
+- Show the actual app interface on a phone/watch
+
+For FINANCE apps:
+- Professional business setting
+- Person using financial app on phone/laptop
+- Charts, graphs, financial elements
+- Modern office environment
+
+For EDUCATION apps:
+- Students using the app
+- Learning environment
+- Educational materials visible
+
+For ENTERTAINMENT apps:
+- People enjoying the app
+- Fun, engaging environment
+- Show app interface being used
+
+Make the prompt very specific about:
+- What people are doing
+- What devices/screens show
+- The environment/setting
+- Professional photography style
+- Realistic, not cartoon
+
+Return only the detailed prompt, nothing else."""
+
+_SMART_PROMPT_HUMAN_TEMPLATE = """Create specific prompt for a {image_type} image for {app_name} {category} app
+
+App Details:
+- Name: {app_name}
+- Category: {category}
+- Description: {description}
+- User request: {user_prompt}"""
+
+# Fallback prompts per category - built once at import, only the chosen one is formatted
+_CATEGORY_PROMPTS: Mapping[str, str] = MappingProxyType({
+    "healthcare": "young athletic person wearing smartwatch fitness tracker, checking heart rate and calories on phone app, modern gym background, professional product photography, realistic detailed, smartphone screen showing {app_name} fitness app interface with charts and data",
+    "finance": "professional business person using {app_name} financial app on smartphone, modern office setting, charts and graphs visible on phone screen, budget tracking interface, clean professional photography, realistic detailed",
+    "education": "students using {app_name} learning app on tablet, modern classroom or library setting, educational interface visible on screen, people engaged in learning, professional photography, realistic detailed",
+    "entertainment": "people enjoying {app_name} entertainment app on phones, fun social setting, app interface visible on screens, engaged users, modern professional photography, realistic detailed",
+    "travel": "traveler using {app_name} travel app on phone, airport or destination background, map and travel booking interface on screen, professional travel photography, realistic detailed",
+    "food": "person using {app_name} food app in kitchen or restaurant, recipe or food delivery interface on phone screen, appetizing food visible, professional food photography, realistic detailed",
+    "technology": "tech professional using {app_name} app on modern devices, clean tech office environment, app interface clearly visible on screens, professional tech photography, realistic detailed"
+})
+
 class LeonardoAgent:
    """
    AI image generation with workflow-aware prompts
    """
    
+   # Enhanced prompts depend only on the request fields - shared by every LeonardoAgent so a
+   # repeat request skips the prompt-writing LLM round-trip
+   _prompt_cache = TTLCache(
+       maxsize=int(os.getenv("JARVIS_IMAGE_PROMPT_CACHE_SIZE", "1024")),
+       ttl=float(os.getenv("JARVIS_IMAGE_PROMPT_CACHE_TTL", "3600"))
+   )
+   # (image_type, category) -> enhanced prompt with the app's name/description as slots
+   _prompt_templates = TTLCache(
+       maxsize=256,
+       ttl=float(os.getenv("JARVIS_IMAGE_PROMPT_CACHE_TTL", "3600"))
+   )
+   # request key -> generation in flight, so concurrent duplicates make one upstream call
+   _inflight: Dict[str, asyncio.Future] = {}
+   
+   # Generated images on disk, created on first use (see _get_image_cache)
+   _image_cache = None
+   _image_cache_initialized = False
+   
    def __init__(self):
        # Keep the working Google Gemini, i was using stable diffusion from hugging face previously but wanted me to use pro
-       api_key = os.getenv("GOOGLE_API_KEY")
-       self.client = genai.Client(api_key=api_key)
+       self.client = get_genai_client()
        
-       # Add LLM for smart prompt generation to generate the images, using gemini 2.0 flash
-       self.llm = ChatGoogleGenerativeAI(
-           model="gemini-2.0-flash",
-           temperature=0.7,
-           google_api_key=os.getenv("GOOGLE_API_KEY"),
-           convert_system_message_to_human=True
-       )
+       # Add LLM for smart prompt generation to generate the images, using gemini 2.0 flash-lite
+       self.llm = get_chat_llm(temperature=0.7, model=_PROMPT_MODEL)
        
-       print("Leonardo Agent initialized with workflow integration")
+       logger.info("Leonardo Agent initialized with workflow integration")
+   
+   async def warmup(self, timeout: float = 10.0):
+       """
+       Open the Gemini connections before the first user request needs them
+       A one-token chat call and a model lookup - no image is generated, so nothing is billed
+       for images. Failures are only logged; the real request just pays the cold start instead
+       """
+       async def _warm():
+           await asyncio.gather(
+               self.llm.ainvoke([HumanMessage(content="ok")]),
+               self.client.aio.models.get(model=_IMAGE_MODEL)
+           )
+       
+       try:
+           await asyncio.wait_for(_warm(), timeout)
+           logger.info("Leonardo Agent warmed up")
+       except Exception as e:
+           logger.warning("Leonardo Agent warm-up skipped: %r", e)
    
    async def generate_marketing_image(self, 
                                     idea_context: Dict[str, Any], 
@@ -41,23 +164,56 @@ class LeonardoAgent:
                                     image_type: str = "marketing") -> Dict[str, Any]:
        """
        Generate enhanced images based on app workflow context
+       Identical requests already in flight share one generation instead of each running their own
+       """
+       app_category = idea_context.get("category", "technology")
+       app_name = idea_context.get("name", "App")
+       app_description = idea_context.get("description", "")
+       
+       key = make_cache_key(image_type, app_category, app_name, app_description, user_prompt)
+       task = self._inflight.get(key)
+       if task is None:
+           task = asyncio.ensure_future(
+               self._generate_image(app_name, app_category, app_description, user_prompt, image_type)
+           )
+           self._inflight[key] = task
+           task.add_done_callback(lambda _task: self._inflight.pop(key, None))
+       
+       # shield - one caller being cancelled must not cancel the generation the others wait on
+       result = dict(await asyncio.shield(task))
+       # Own copy per caller - the design route pops image_bytes out of the result
+       if result.get("success"):
+           result["metadata"] = idea_context
+       return result
+   
+   async def _generate_image(self, app_name: str, app_category: str, app_description: str,
+                             user_prompt: str, image_type: str) -> Dict[str, Any]:
+       """
+       One prompt-enhancement + image generation round-trip
        """
        try:
-           app_category = idea_context.get("category", "technology")
-           app_name = idea_context.get("name", "App")
-           app_description = idea_context.get("description", "")
-           
-           print(f"Generating specific {image_type} image for {app_name}")
+           logger.info("Generating specific %s image for %s", image_type, app_name)
            
            # Create much better, specific prompts basically doing prompt engineering in the whole file based on different app types that i have
            enhanced_prompt = await self._create_smart_prompt(
                app_name, app_category, app_description, user_prompt, image_type
            )
            
-           print(f"Using enhanced prompt: {enhanced_prompt}")
+           logger.info("Using enhanced prompt: %s", enhanced_prompt)
+           
+           # Same prompt, model and output format -> same picture, so a repeat skips generation
+           image_cache = self._get_image_cache()
+           image_key = make_cache_key(enhanced_prompt, _IMAGE_MODEL, _IMAGE_FORMAT)
+           if image_cache is not None:
+               cached = await asyncio.to_thread(image_cache.get, image_key)
+               if cached is not None:
+                   image_bytes, mime_type = cached
+                   logger.info("Image served from disk cache (%d bytes)", len(image_bytes))
+                   return self._image_result(image_bytes, mime_type, enhanced_prompt, image_type)
            
-           response = self.client.models.generate_content(
-               model="gemini-2.0-flash-preview-image-generation",
+           # Async client - the sync call would block the event loop for the whole generation
+           response = await self.client.aio.models.generate_content(
+               model=_IMAGE_MODEL,
                contents=enhanced_prompt,
                config=types.GenerateContentConfig(
                    response_modalities=['TEXT', 'IMAGE']
@@ -67,27 +223,67 @@ class LeonardoAgent:
            # Extract image - FIXED method
            for part in response.candidates[0].content.parts:
                if part.inline_data is not None:
-                   # Convert raw bytes to base64 string
-                   image_base64 = base64.b64encode(part.inline_data.data).decode('utf-8')
+                   image_bytes = part.inline_data.data
+                   mime_type = part.inline_data.mime_type or "image/png"
+                   if _IMAGE_FORMAT == "webp" and mime_type != "image/webp":
+                       try:
+                           image_bytes = await asyncio.to_thread(_encode_webp, image_bytes)
+                           mime_type = "image/webp"
+                       except Exception as e:
+                           # No WebP support in this Pillow build, or an undecodable image - send as is
+                           logger.warning("WebP re-encode skipped: %s", e)
                    
-                   print(f"Image generated successfully")
-                   print(f"Base64 length: {len(image_base64)} characters")
+                   logger.info("Image generated successfully (%d bytes)", len(image_bytes))
                    
-                   return {
-                       "success": True,
-                       "image_data": image_base64,
-                       "prompt_used": enhanced_prompt,
-                       "model_used": "gemini-2.0-flash-preview-image-generation",
-                       "image_type": image_type,
-                       "metadata": idea_context
-                   }
+                   if image_cache is not None:
+                       try:
+                           await asyncio.to_thread(image_cache.set, image_key, (image_bytes, mime_type))
+                       except Exception as e:
+                           logger.warning("Image cache write skipped: %s", e)
+                   
+                   return self._image_result(image_bytes, mime_type, enhanced_prompt, image_type)
            
            return {"success": False, "error": "No image generated"}
            
        except Exception as e:
-           print(f"Error generating image: {e}")
+           logger.error("Error generating image: %s", e)
            return {"success": False, "error": str(e)}
    
+   @staticmethod
+   def _image_result(image_bytes: bytes, mime_type: str, enhanced_prompt: str, image_type: str) -> Dict[str, Any]:
+       # Raw bytes - base64 is only needed at a JSON boundary (see image_to_base64)
+       return {
+           "success": True,
+           "image_bytes": image_bytes,
+           "mime_type": mime_type,
+           "prompt_used": enhanced_prompt,
+           "model_used": _IMAGE_MODEL,
+           "image_type": image_type
+       }
+   
+   @classmethod
+   def _get_image_cache(cls):
+       """
+       On-disk LRU cache of generated images, shared by every LeonardoAgent and kept
+       across restarts. Needs the optional diskcache package - without it every
+       request generates; JARVIS_IMAGE_CACHE_DIR="" turns it off
+       """
+       if not cls._image_cache_initialized:
+           cls._image_cache_initialized = True
+           cache_dir = os.getenv("JARVIS_IMAGE_CACHE_DIR", ".jarvis_image_cache")
+           if cache_dir:
+               try:
+                   import diskcache
+                   cls._image_cache = diskcache.Cache(
+                       cache_dir,
+                       size_limit=int(os.getenv("JARVIS_IMAGE_CACHE_SIZE_MB", "1024")) * 2**20,
+                       eviction_policy="least-recently-used"
+                   )
+                   logger.info("Image disk cache enabled")
+               except Exception as e:
+                   logger.warning("Image disk cache unavailable: %s", e)
+       return cls._image_cache
+   
    async def _create_smart_prompt(self, app_name: str, category: str, description: str, user_prompt: str, image_type: str) -> str:
        """
        Use AI to create much better, specific prompts
@@ -113,52 +309,27 @@ class LeonardoAgent:
                """
                return logo_prompt + ", high quality logo design, app icon style, vector graphics"
            
-           system_prompt = f"""
-           Create a detailed, specific image prompt for a {image_type} image.
-           
-           App Details:
-           - Name: {app_name}
-           - Category: {category}
-           - Description: {description}
-           - User request: {user_prompt}
-           
-           Create a prompt that will generate a realistic, professional image showing:
-           
-           For FITNESS/HEALTHCARE apps:
-           - Person using/wearing the fitness device
-           - Modern gym or outdoor setting
-           - Professional product photography style
-           - Show the actual app interface on a phone/watch
-           
-           For FINANCE apps:
-           - Professional business setting
-           - Person using financial app on phone/laptop
-           - Charts, graphs, financial elements
-           - Modern office environment
-           
-           For EDUCATION apps:
-           - Students using the app
-           - Learning environment
-           - Educational materials visible
-           
-           For ENTERTAINMENT apps:
-           - People enjoying the app
-           - Fun, engaging environment
-           - Show app interface being used
+           cache_key = make_cache_key(image_type, category, app_name, description, user_prompt)
+           cached_prompt = self._prompt_cache.get(cache_key)
+           if cached_prompt is not None:
+               return cached_prompt
            
-           Make the prompt very specific about:
-           - What people are doing
-           - What devices/screens show
-           - The environment/setting
-           - Professional photography style
-           - Realistic, not cartoon
-           
-           Return only the detailed prompt, nothing else.
-           """
+           # A specific user request shapes the whole prompt, so only plain requests share templates
+           template_key = (image_type.lower(), category.lower())
+           use_template = _REUSE_PROMPT_TEMPLATES and not user_prompt
+           if use_template:
+               template = self._prompt_templates.get(template_key)
+               if template is not None:
+                   final_prompt = template.replace(_NAME_SLOT, app_name).replace(_DESCRIPTION_SLOT, description)
+                   self._prompt_cache.set(cache_key, final_prompt)
+                   return final_prompt
            
            messages = [
-               SystemMessage(content=system_prompt),
-               HumanMessage(content=f"Create specific prompt for {app_name} {category} app")
+               SystemMessage(content=_SMART_PROMPT_SYSTEM),
+               HumanMessage(content=_SMART_PROMPT_HUMAN_TEMPLATE.format(
+                   image_type=image_type, app_name=app_name, category=category,
+                   description=description, user_prompt=user_prompt
+               ))
            ]
            
            response = await self.llm.ainvoke(messages)
@@ -168,13 +339,35 @@ class LeonardoAgent:
            quality_terms = ", professional photography, high resolution, realistic, detailed, modern"
            final_prompt = enhanced_prompt + quality_terms
            
+           self._prompt_cache.set(cache_key, final_prompt)
+           if use_template:
+               self._store_prompt_template(template_key, final_prompt, app_name, description)
            return final_prompt
            
        except Exception as e:
-           print(f"Error creating smart prompt: {e}")
+           logger.error("Error creating smart prompt: %s", e)
            # Fallback to category-specific prompts
            return self._get_category_specific_prompt(app_name, category, description, user_prompt, image_type)
    
+   def _store_prompt_template(self, template_key: tuple, prompt: str, app_name: str, description: str):
+       """
+       Keep an enhanced prompt as a template for its (image_type, category)
+       Only when every app-specific input shows up verbatim - otherwise the LLM worked
+       it into the prompt in a way a plain substitution can't redo
+       """
+       if len(app_name) < 3 or not description:
+           return
+       
+       # One pass, longest first - the description usually contains the app name, so slotting
+       # the name first would leave the old description behind in the template
+       slots = {app_name: _NAME_SLOT, description: _DESCRIPTION_SLOT}
+       pattern = re.compile("|".join(re.escape(text) for text in sorted(slots, key=len, reverse=True)))
+       template = pattern.sub(lambda match: slots[match.group()], prompt)
+       
+       if _NAME_SLOT not in template or _DESCRIPTION_SLOT not in template:
+           return
+       self._prompt_templates.set(template_key, template)
+   
    def _get_category_specific_prompt(self, app_name: str, category: str, description: str, user_prompt: str, image_type: str) -> str:
        """
        Fallback category-specific prompts that are much more detailed
@@ -183,24 +376,10 @@ class LeonardoAgent:
        if image_type.lower() == "logo":
            return f"Modern minimalist logo design for {app_name} {category} app, clean vector graphics, professional branding, app icon style, simple geometric design"
        
-       # Using the user prompt if provided
-       base_prompt = user_prompt if user_prompt else f"Create a {category} image"
-       
-       prompts = {
-           "healthcare": f"young athletic person wearing smartwatch fitness tracker, checking heart rate and calories on phone app, modern gym background, professional product photography, realistic detailed, smartphone screen showing {app_name} fitness app interface with charts and data",
-           
-           "finance": f"professional business person using {app_name} financial app on smartphone, modern office setting, charts and graphs visible on phone screen, budget tracking interface, clean professional photography, realistic detailed",
-           
-           "education": f"students using {app_name} learning app on tablet, modern classroom or library setting, educational interface visible on screen, people engaged in learning, professional photography, realistic detailed",
-           
-           "entertainment": f"people enjoying {app_name} entertainment app on phones, fun social setting, app interface visible on screens, engaged users, modern professional photography, realistic detailed",
-           
-           "travel": f"traveler using {app_name} travel app on phone, airport or destination background, map and travel booking interface on screen, professional travel photography, realistic detailed",
-           
-           "food": f"person using {app_name} food app in kitchen or restaurant, recipe or food delivery interface on phone screen, appetizing food visible, professional food photography, realistic detailed",
-           
-           "technology": f"tech professional using {app_name} app on modern devices, clean tech office environment, app interface clearly visible on screens, professional tech photography, realistic detailed"
-       }
-       
-       category_prompt = prompts.get(category, base_prompt)
+       template = _CATEGORY_PROMPTS.get(category)
+       if template is None:
+           # Using the user prompt if provided
+           category_prompt = user_prompt if user_prompt else f"Create a {category} image"
+       else:
+           category_prompt = template.format(app_name=app_name)
        return category_prompt + ", high quality, professional, modern design"
\ No newline at end of file
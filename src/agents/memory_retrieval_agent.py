@@ -5,13 +5,12 @@ Removed all hardcoded patterns - just uses semantic search for everything
 Much shorter and simpler than the original i had a fall back regex before for pattern matching
 """
 
-import os
 from datetime import datetime
 from typing import Dict, Any, List
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import SystemMessage, HumanMessage
 from dotenv import load_dotenv
 from src.memory.vector_memory_manager import VectorMemoryManager
+from src.utils.llm import get_chat_llm
 
 load_dotenv()
 
@@ -23,12 +22,8 @@ class MemoryRetrievalAgent:
     
     def __init__(self, memory_manager: VectorMemoryManager = None):
         # honestly this is way cleaner than the regex mess we had before
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            temperature=0.2,  # keeping it low so responses stay consistent
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            convert_system_message_to_human=True
-        )
+        # shared client so we reuse one Gemini connection pool across agents
+        self.llm = get_chat_llm(temperature=0.2)  # keeping it low so responses stay consistent
         
         self.memory_manager = memory_manager or VectorMemoryManager()
         print("Simple Regex-Free Memory Retrieval Agent initialized")
@@ -7,7 +7,6 @@ Uses Gemini Pro for all routing decisions and intent understanding
 import os
 from typing import Dict, Any, Optional, List
 from enum import Enum
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import HumanMessage, SystemMessage
 from dotenv import load_dotenv
 import json
@@ -15,10 +14,15 @@ import re
 
 # Simple logging
 from src.utils.logger import get_logger
+from src.utils.ttl_cache import TTLCache
+from src.utils.llm import get_chat_llm
 logger = get_logger("router")
 
 load_dotenv()
 
+# The JSON object in a Gemini reply (it may wrap it in prose or a fence)
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+
 class AppType(str, Enum):
     """Available apps in Steve OS ecosystem"""
     IDEATION = "ideation"
@@ -36,12 +40,8 @@ class RouterAgent:
         logger.info("Initializing Router Agent")
         
         try:
-            self.llm = ChatGoogleGenerativeAI(
-                model="gemini-2.0-flash",
-                temperature=0.3,  # Slightly higher for more natural responses, can tweak and test
-                google_api_key=os.getenv("GOOGLE_API_KEY"),
-                convert_system_message_to_human=True
-            )
+            # Shared client - reuses the process-wide Gemini connection pool
+            self.llm = get_chat_llm(temperature=0.3)  # Slightly higher for more natural responses, can tweak and test
             logger.info("Router Agent initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Router Agent: {str(e)}")
@@ -59,7 +59,11 @@ class RouterAgent:
         """
         
         # Session-based context tracking (only for memory)
-        self.session_contexts = {}
+        # Bounded LRU with expiry so idle sessions don't accumulate for the life of the server
+        self.session_contexts = TTLCache(
+            maxsize=int(os.getenv("JARVIS_ROUTER_SESSIONS", "10000")),
+            ttl=float(os.getenv("JARVIS_ROUTER_SESSION_TTL", "3600"))
+        )
     
     async def route_message(self, 
                           user_message: str, 
@@ -74,8 +78,10 @@ class RouterAgent:
         
         try:
             # Initialize session context if needed
-            if session_id and session_id not in self.session_contexts:
-                self.session_contexts[session_id] = {}
+            session_context = self.session_contexts.get(session_id) if session_id else None
+            if session_id and session_context is None:
+                session_context = {}
+                self.session_contexts[session_id] = session_context
             
             # Let AI handle everything - build comprehensive context
             full_context = self._build_ai_context(
@@ -83,15 +89,18 @@ class RouterAgent:
                 conversation_history or [], 
                 current_app, 
                 context_data or {},
-                session_id
+                session_id,
+                session_context.get("last_ai_decision") if session_context else None
             )
             
             # Single AI call handles all routing logic to make it easy
             routing_decision = await self._ai_comprehensive_routing(full_context)
             
             # Store any AI insights for next interaction so that i have context
+            # (re-stored so an active session stays fresh in the cache)
             if session_id:
-                self.session_contexts[session_id]["last_ai_decision"] = routing_decision
+                session_context["last_ai_decision"] = routing_decision
+                self.session_contexts[session_id] = session_context
             
             logger.info(f"Routing decision: {routing_decision['action']} -> {routing_decision.get('app_to_open', 'chat')}")
             
@@ -102,10 +111,18 @@ class RouterAgent:
             # 
             return await self._ai_error_recovery(user_message, str(e))
     
+    def clear_session(self, session_id: str):
+        """
+        Forget the routing context kept for a session
+        """
+        self.session_contexts.pop(session_id)
+    
     def _build_ai_context(self, user_message: str, conversation_history: List, 
-                         current_app: str, context_data: Dict, session_id: str) -> Dict[str, Any]:
+                         current_app: str, context_data: Dict, session_id: str,
+                         previous_ai_decision: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Build comprehensive context for AI to analyze
+        previous_ai_decision comes from the session context route_message already fetched
         """
         # Check for memory context in context_data
         memory_context = context_data.get('memory_context', {})
@@ -118,7 +135,7 @@ class RouterAgent:
             "context_data": context_data,
             "session_id": session_id,
             "ecosystem_info": self.ecosystem_description,
-            "previous_ai_decision": self.session_contexts.get(session_id, {}).get("last_ai_decision"),
+            "previous_ai_decision": previous_ai_decision,
             "memory_context": memory_context
         }
     
@@ -210,7 +227,7 @@ RESPONSE FORMAT (JSON only):
         """
         try:
             # Extract JSON from AI response
-            json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
+            json_match = _JSON_OBJECT_RE.search(ai_response)
             if json_match:
                 response_data = json.loads(json_match.group())
                 
@@ -268,7 +285,7 @@ Respond with simple JSON:
             response = await self.llm.ainvoke(messages)
             
             # Simple JSON extraction for recovery
-            json_match = re.search(r'\{.*\}', response.content, re.DOTALL)
+            json_match = _JSON_OBJECT_RE.search(response.content)
             if json_match:
                 recovery_data = json.loads(json_match.group())
                 return {
@@ -4,28 +4,44 @@ Story Writer Agent - Converts app actions into narrative user stories, good for
 Transforms raw API events into coherent, searchable user journey documentation for us to perform semantic search
 """
 
-import os
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, Any, List
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import SystemMessage, HumanMessage
 from dotenv import load_dotenv
 import json
+from src.utils.llm import get_chat_llm
 
 load_dotenv()
 
+# Action keyword table, checked in order - the first type with a matching keyword wins
+_ACTION_TYPES = (
+    ('creation', ('generate', 'create', 'build', 'develop', 'draft')),
+    ('modification', ('edit', 'update', 'modify', 'change')),
+    ('sharing', ('send', 'share', 'publish', 'deploy')),
+    ('analysis', ('analyze', 'review', 'check', 'test')),
+    ('planning', ('ideate', 'plan', 'design', 'conceptualize'))
+)
+
+
+@lru_cache(maxsize=256)
+def _classify_action(action: str) -> str:
+    """Action names come from a small fixed set, so each is classified once"""
+    action_lower = action.lower()
+    for action_type, keywords in _ACTION_TYPES:
+        if any(keyword in action_lower for keyword in keywords):
+            return action_type
+    
+    return 'general'
+
 class StoryWriterAgent:
     """
     Converts app actions and user interactions into narrative user stories
     """
     
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            temperature=0.4,  # Slightly creative for natural storytelling
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            convert_system_message_to_human=True
-        )
+        # Shared client - every story writer reuses one Gemini connection pool
+        self.llm = get_chat_llm(temperature=0.4)  # Slightly creative for natural storytelling
         
         print("Story Writer Agent initialized")
     
@@ -57,7 +73,11 @@ class StoryWriterAgent:
             # Extract event details
             app_name = event_data.get('app_name', 'unknown')
             action = event_data.get('action', 'unknown_action')
-            timestamp = event_data.get('timestamp', datetime.now().isoformat())
+            # Read the clock once per story - the metadata and story id reuse it
+            now = datetime.now()
+            timestamp = event_data.get('timestamp')
+            if timestamp is None:
+                timestamp = now.isoformat()
             action_data = event_data.get('data', {})
             
             # Generate narrative story
@@ -70,10 +90,10 @@ class StoryWriterAgent:
             )
             
             # Create metadata for vector storage
-            metadata = self._create_metadata(event_data, session_context)
+            metadata = self._create_metadata(event_data, session_context, timestamp, now)
             
             # Generate unique story ID
-            story_id = f"story_{event_data.get('session_id', 'unknown')}_{int(datetime.now().timestamp())}"
+            story_id = f"story_{event_data.get('session_id', 'unknown')}_{int(now.timestamp())}"
             
             return {
                 'story_text': story_text,
@@ -209,9 +229,12 @@ ACTION DATA:
     
     def _create_metadata(self, 
                         event_data: Dict[str, Any], 
-                        session_context: Dict[str, Any]) -> Dict[str, Any]:
+                        session_context: Dict[str, Any],
+                        timestamp: str,
+                        now: datetime) -> Dict[str, Any]:
         """
         Create metadata for vector storage and retrieval
+        timestamp and now are the values write_story already resolved
         """
         app_context = session_context.get('app_data', {}) if session_context else {}
         ideation_data = app_context.get('ideation', {})
@@ -219,34 +242,21 @@ ACTION DATA:
         return {
             'app_name': event_data.get('app_name', 'unknown'),
             'action': event_data.get('action', 'unknown'),
-            'timestamp': event_data.get('timestamp', datetime.now().isoformat()),
+            'timestamp': timestamp,
             'session_id': event_data.get('session_id', 'unknown'),
             'user_id': event_data.get('user_id', 'unknown'),
             'project_name': ideation_data.get('name', 'unknown_project'),
             'project_category': ideation_data.get('category', 'unknown'),
             'action_type': self._classify_action_type(event_data.get('action', '')),
-            'day_of_week': datetime.now().strftime('%A'),
-            'hour_of_day': datetime.now().hour
+            'day_of_week': now.strftime('%A'),
+            'hour_of_day': now.hour
         }
     
     def _classify_action_type(self, action: str) -> str:
         """
         Classify actions into broader categories for better retrieval
         """
-        action_types = {
-            'creation': ['generate', 'create', 'build', 'develop', 'draft'],
-            'modification': ['edit', 'update', 'modify', 'change'],
-            'sharing': ['send', 'share', 'publish', 'deploy'],
-            'analysis': ['analyze', 'review', 'check', 'test'],
-            'planning': ['ideate', 'plan', 'design', 'conceptualize']
-        }
-        
-        action_lower = action.lower()
-        for action_type, keywords in action_types.items():
-            if any(keyword in action_lower for keyword in keywords):
-                return action_type
-        
-        return 'general'
+        return _classify_action(action)
     
     async def write_multiple_stories(self, events: List[Dict[str, Any]], session_context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """
@@ -8,12 +8,13 @@ from fastapi import APIRouter, HTTPException, status
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
+import os
 import uuid
 import re
 
 # Import our agents from src agents
 from src.agents.router_agent import RouterAgent
-from src.agents.leonardo_agent import LeonardoAgent
+from src.agents.leonardo_agent import LeonardoAgent, image_to_base64
 from src.agents.code_agent import CodeAgent
 from src.agents.email_agent import EmailAgent
 from src.agents.email_sender import EmailSender
@@ -34,6 +35,10 @@ email_sender = EmailSender()
 # In-memory storage for session data (temporary solution before rag still very useful)
 session_storage = {}
 
+# Only the tail of a chat is ever used (the router reads the last 5 turns), so cap
+# what each session keeps instead of growing it for the life of the session
+MAX_CONVERSATION_HISTORY = int(os.getenv("JARVIS_MAX_CONVERSATION_HISTORY", "32"))
+
 # Pydantic models for request/response validation
 class ChatMessage(BaseModel):
     message: str
@@ -54,22 +59,23 @@ class AppAction(BaseModel):
     session_id: str
     data: Optional[Dict[str, Any]] = None
 
+# Common patterns like "app called X" or "X app", compiled once at import - tried in order
+_APP_NAME_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'(?:app (?:called|named)\s+)([a-zA-Z]\w+)',
+    r'([a-zA-Z]\w+)(?:\s+app)',
+    r'(?:called|named)\s+([a-zA-Z]\w+)',
+    r'^([a-zA-Z]\w+)'  # First word if nothing else matches
+))
+_NON_WORD_RE = re.compile(r'[^\w]')
+
 # Helper functions for context extraction
 def _extract_app_name_from_text(text: str) -> str:
     """Extract app name from user requirements text"""
     if not text:
         return "MyApp"
     
-    # Look for common patterns like "app called X" or "X app" using regex for matching patterns 
-    patterns = [
-        r'(?:app (?:called|named)\s+)([a-zA-Z]\w+)',
-        r'([a-zA-Z]\w+)(?:\s+app)',
-        r'(?:called|named)\s+([a-zA-Z]\w+)',
-        r'^([a-zA-Z]\w+)'  # First word if nothing else matches
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in _APP_NAME_PATTERNS:
+        match = pattern.search(text)
         if match:
             app_name = match.group(1).strip()
             if len(app_name) > 1:  # Avoid single letters
@@ -78,7 +84,7 @@ def _extract_app_name_from_text(text: str) -> str:
     # Fallback: take first meaningful word
     words = text.strip().split()
     if words:
-        first_word = re.sub(r'[^\w]', '', words[0])
+        first_word = _NON_WORD_RE.sub('', words[0])
         if len(first_word) > 1:
             return first_word.title()
     
@@ -106,15 +112,17 @@ def _extract_app_category_from_text(text: str) -> str:
     
     return "application"  # Default category
 
-def _ensure_session_structure(session_id: str):
-    """Ensure session has proper structure"""
-    if session_id not in session_storage:
-        session_storage[session_id] = {
+def _ensure_session_structure(session_id: str) -> Dict[str, Any]:
+    """Get the session, creating it with the proper structure if needed - one lookup when it exists"""
+    session = session_storage.get(session_id)
+    if session is None:
+        session = session_storage[session_id] = {
             "user_id": "default_user",
             "conversation_history": [],
             "current_app": None,
             "app_data": {}
         }
+    return session
 
 # Main chat post endpoint 
 @router.post("/chat", response_model=ChatResponse)
@@ -128,15 +136,15 @@ async def chat_with_steve(message: ChatMessage):
         if not session_id:
             session_id = str(uuid.uuid4())
         
-        _ensure_session_structure(session_id)
-        
         # Getting thr current session context
-        session_context = session_storage.get(session_id, {})
+        session_context = _ensure_session_structure(session_id)
         current_app = session_context.get("current_app")
         conversation_history = session_context.get("conversation_history", [])
         
         # Add current message to history
         conversation_history.append({"user": message.message})
+        if len(conversation_history) > MAX_CONVERSATION_HISTORY:
+            del conversation_history[:-MAX_CONVERSATION_HISTORY]
         
         # Get memory context for the user's message
         memory_system = get_memory_system()
@@ -162,9 +170,9 @@ async def chat_with_steve(message: ChatMessage):
         )
         
         # Updatimg the session storage
-        session_storage[session_id]["conversation_history"] = conversation_history
+        session_context["conversation_history"] = conversation_history
         if routing_result["action"] == "open_app" and routing_result["app_to_open"]:
-            session_storage[session_id]["current_app"] = routing_result["app_to_open"]
+            session_context["current_app"] = routing_result["app_to_open"]
         
         # Record chat interaction in memory system
         await memory_system.record_app_action(
@@ -208,10 +216,10 @@ async def submit_ideation_data(action: AppAction):
         session_id = action.session_id
         ideation_data = action.data
         
-        _ensure_session_structure(session_id)
+        session = _ensure_session_structure(session_id)
         
         # Save ideation context in memory
-        session_storage[session_id]["app_data"]["ideation"] = ideation_data
+        session["app_data"]["ideation"] = ideation_data
         
         # recording the ideation activity in memory
         memory_system = get_memory_system()
@@ -220,7 +228,7 @@ async def submit_ideation_data(action: AppAction):
             action="submit_data",
             session_id=session_id,
             action_data=ideation_data,
-            session_context=session_storage[session_id]
+            session_context=session
         )
         
         return JSONResponse({
@@ -245,11 +253,10 @@ async def generate_app_code(action: AppAction):
         session_id = action.session_id
         user_requirements = action.data.get("requirements", "")
         
-        _ensure_session_structure(session_id)
+        session = _ensure_session_structure(session_id)
         
         # Get existing ideation context from memory
-        session_data = session_storage.get(session_id, {})
-        ideation_data = session_data.get("app_data", {}).get("ideation", {})
+        ideation_data = session.get("app_data", {}).get("ideation", {})
         
         # If no ideation data exists, extract it from user input and SAVE IT
         if not ideation_data:
@@ -267,7 +274,7 @@ async def generate_app_code(action: AppAction):
             }
             
             # Saveng the extracted ideation data to session for chat system
-            session_storage[session_id]["app_data"]["ideation"] = ideation_data
+            session["app_data"]["ideation"] = ideation_data
             
             print(f"Extracted and saved app context: {ideation_data}")
         else:
@@ -281,7 +288,7 @@ async def generate_app_code(action: AppAction):
         
         if generation_result["success"]:
             # Save the generated app context in memory
-            session_storage[session_id]["app_data"]["vibe_studio"] = {
+            session["app_data"]["vibe_studio"] = {
                 "app_name": generation_result["app_name"],
                 "project_files": generation_result["project_files"],
                 "app_structure": generation_result["app_structure"],
@@ -301,7 +308,7 @@ async def generate_app_code(action: AppAction):
                     "app_structure": generation_result.get("app_structure", {}),
                     "model_used": generation_result.get("model_used", "unknown")
                 },
-                session_context=session_storage[session_id]
+                session_context=session
             )
             
             print(f"Saved Vibe Studio context for session {session_id}")
@@ -331,11 +338,10 @@ async def generate_marketing_image(action: AppAction):
         image_type = action.data.get("image_type", "marketing")
         context = action.data.get("context", "")
         
-        _ensure_session_structure(session_id)
+        session = _ensure_session_structure(session_id)
         
         # Get context from memory - try multiple sources
-        session_data = session_storage.get(session_id, {})
-        ideation_data = session_data.get("app_data", {}).get("ideation", {})
+        ideation_data = session.get("app_data", {}).get("ideation", {})
         
         # If no ideation data but user provided context, extract it
         if not ideation_data and context:
@@ -351,7 +357,7 @@ async def generate_marketing_image(action: AppAction):
             }
             
             # Save extracted context
-            session_storage[session_id]["app_data"]["ideation"] = ideation_data
+            session["app_data"]["ideation"] = ideation_data
             print(f"Extracted and saved design context: {ideation_data}")
         
         # Fallback to generic data if still no contex
@@ -371,7 +377,7 @@ async def generate_marketing_image(action: AppAction):
         
         if image_result["success"]:
             # Save the design context in memory
-            session_storage[session_id]["app_data"]["design"] = {
+            session["app_data"]["design"] = {
                 "image_type": image_type,
                 "user_prompt": user_prompt,
                 "context_used": context,
@@ -393,9 +399,12 @@ async def generate_marketing_image(action: AppAction):
                     "model_used": image_result.get("model_used", "unknown"),
                     "prompt_used": image_result.get("prompt_used", user_prompt)
                 },
-                session_context=session_storage[session_id]
+                session_context=session
             )
         
+            # The agent hands back raw bytes - base64 only here, at the JSON boundary
+            image_result["image_data"] = image_to_base64(image_result.pop("image_bytes"))
+        
         return JSONResponse({
             "status": "success" if image_result["success"] else "error",
             "result": image_result,
@@ -420,29 +429,30 @@ async def draft_marketing_email(action: AppAction):
         target_audience = action.data.get("target_audience", "general")
         context = action.data.get("context", "")
         
-        _ensure_session_structure(session_id)
+        session = _ensure_session_structure(session_id)
         
-        # Get full context from memory
-        session_data = session_storage.get(session_id, {})
-        app_data = session_data.get("app_data", {})
+        # Get full context from memory - one lookup per app below
+        app_data = session.get("app_data", {})
+        get_app_data = app_data.get
         
         # Build comprehensive app context for email
-        app_context = {
-            "app_name": "Generated App",
-            "app_category": "technology",
-            "app_description": "An innovative application"
-        }
-        
         # Extract data from each app in the workflow
-        if "ideation" in app_data:
-            ideation = app_data["ideation"]
-            app_context.update({
-                "app_name": ideation.get("name", app_context["app_name"]),
-                "app_category": ideation.get("category", app_context["app_category"]),
-                "app_description": ideation.get("description", app_context["app_description"]),
+        ideation = get_app_data("ideation")
+        if ideation is not None:
+            app_context = {
+                "app_name": ideation.get("name", "Generated App"),
+                "app_category": ideation.get("category", "technology"),
+                "app_description": ideation.get("description", "An innovative application"),
                 "ideation_data": ideation
-            })
-        elif context:
+            }
+        else:
+            app_context = {
+                "app_name": "Generated App",
+                "app_category": "technology",
+                "app_description": "An innovative application"
+            }
+        
+        if ideation is None and context:
             # If no ideation data but user provided context, extract it
             print(f"No ideation data, extracting from email context: {context}")
             
@@ -456,7 +466,7 @@ async def draft_marketing_email(action: AppAction):
             }
             
             # Save extracted context
-            session_storage[session_id]["app_data"]["ideation"] = ideation_data
+            session["app_data"]["ideation"] = ideation_data
             
             # Update app_context
             app_context.update({
@@ -468,11 +478,13 @@ async def draft_marketing_email(action: AppAction):
             
             print(f"Extracted and saved email context: {ideation_data}")
         
-        if "vibe_studio" in app_data:
-            app_context["vibe_studio_data"] = app_data["vibe_studio"]
+        vibe_studio = get_app_data("vibe_studio")
+        if vibe_studio is not None:
+            app_context["vibe_studio_data"] = vibe_studio
         
-        if "design" in app_data:
-            app_context["design_data"] = app_data["design"]
+        design = get_app_data("design")
+        if design is not None:
+            app_context["design_data"] = design
         
         # Generate the email
         email_result = await email_agent.generate_launch_email(
@@ -483,7 +495,7 @@ async def draft_marketing_email(action: AppAction):
         
         if email_result["success"]:
             # Save the email context in memory
-            session_storage[session_id]["app_data"]["gmail"] = {
+            session["app_data"]["gmail"] = {
                 "email_type": email_type,
                 "target_audience": target_audience,
                 "context_used": context,
@@ -507,7 +519,7 @@ async def draft_marketing_email(action: AppAction):
                     "context_used": context,
                     "email_length": len(email_result.get("email_body", ""))
                 },
-                session_context=session_storage[session_id]
+                session_context=session
             )
         
         return JSONResponse({
@@ -545,7 +557,7 @@ async def send_email_via_mcp(action: AppAction):
                 detail="Missing required fields: recipient_email, subject, email_body"
             )
         
-        _ensure_session_structure(session_id)
+        session = _ensure_session_structure(session_id)
         
         # Send the email via MCP
         print(f"Attempting to send email via MCP to {recipient_email}")
@@ -558,7 +570,7 @@ async def send_email_via_mcp(action: AppAction):
         
         if send_result["success"]:
             # Update session storage with send status
-            session_storage[session_id]["app_data"]["gmail_send"] = {
+            session["app_data"]["gmail_send"] = {
                 "sent": True,
                 "message_id": send_result["message_id"],
                 "recipient": recipient_email,
@@ -581,7 +593,7 @@ async def send_email_via_mcp(action: AppAction):
                     "method": send_result.get("method", "mcp"),
                     "success": True
                 },
-                session_context=session_storage[session_id]
+                session_context=session
             )
         
         return JSONResponse({
@@ -702,8 +714,9 @@ async def reset_session(session_id: str):
     Reset session context (useful for starting over)
     """
     try:
-        if session_id in session_storage:
-            del session_storage[session_id]
+        # Drop the session and the router's per-session context together
+        session_storage.pop(session_id, None)
+        router_agent.clear_session(session_id)
         
         return JSONResponse({
             "status": "success",
@@ -755,25 +768,34 @@ async def check_agents_health():
         )
 
 # Helper functions
+# Workflow steps in order: (progress flag, next-step recommendation while it's incomplete)
+_WORKFLOW_STEPS = (
+    ("ideation_complete", "Complete ideation to develop your app concept"),
+    ("vibe_studio_complete", "Use Vibe Studio to build your app"),
+    ("design_complete", "Create marketing materials with the Design app"),
+    ("gmail_complete", "Draft launch emails with Gmail integration"),
+    ("email_sent", "Send your launch email to complete the workflow!"),
+)
+
 def _analyze_workflow_progress(context: Dict[str, Any]) -> Dict[str, Any]:
     """
     Analyze how far the user has progressed through the workflow
     """
-    app_data = context.get("app_data", {})
+    get = context.get("app_data", {}).get
     
     progress = {
-        "ideation_complete": "ideation" in app_data and bool(app_data["ideation"]),
-        "vibe_studio_complete": "vibe_studio" in app_data and bool(app_data["vibe_studio"]),
-        "design_complete": "design" in app_data and bool(app_data["design"]),
-        "gmail_complete": "gmail" in app_data and bool(app_data["gmail"]),
-        "email_sent": "gmail_send" in app_data and app_data["gmail_send"].get("sent", False)
+        "ideation_complete": bool(get("ideation")),
+        "vibe_studio_complete": bool(get("vibe_studio")),
+        "design_complete": bool(get("design")),
+        "gmail_complete": bool(get("gmail")),
+        "email_sent": (get("gmail_send") or {}).get("sent", False)
     }
     
-    completed_steps = sum([progress["ideation_complete"], progress["vibe_studio_complete"], 
-                          progress["design_complete"], progress["gmail_complete"]])
+    completed_steps = (progress["ideation_complete"] + progress["vibe_studio_complete"]
+                       + progress["design_complete"] + progress["gmail_complete"])
     progress["completion_percentage"] = (completed_steps / 4) * 100
     progress["next_recommended_step"] = _get_next_step(progress)
-    progress["current_app_context"] = app_data.get("ideation", {})
+    progress["current_app_context"] = get("ideation", {})
     
     return progress
 
@@ -781,15 +803,7 @@ def _get_next_step(progress: Dict[str, Any]) -> str:
     """
     Recommend the next step in the workflow
     """
-    if not progress["ideation_complete"]:
-        return "Complete ideation to develop your app concept"
-    elif not progress["vibe_studio_complete"]:
-        return "Use Vibe Studio to build your app"
-    elif not progress["design_complete"]:
-        return "Create marketing materials with the Design app"
-    elif not progress["gmail_complete"]:
-        return "Draft launch emails with Gmail integration"
-    elif not progress["email_sent"]:
-        return "Send your launch email to complete the workflow!"
-    else:
-        return "Workflow complete! Your app is ready and launched!"
\ No newline at end of file
+    for flag, recommendation in _WORKFLOW_STEPS:
+        if not progress[flag]:
+            return recommendation
+    return "Workflow complete! Your app is ready and launched!"
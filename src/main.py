@@ -15,7 +15,7 @@ from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 # Import our components
-from src.api.routes import router
+from src.api.routes import router, email_sender, leonardo_agent
 from src.memory.memory_system import initialize_memory_system, get_memory_system
 
 # Simple logging
@@ -28,6 +28,9 @@ load_dotenv()
 # Global memory system reference
 memory_system = None
 
+# Open the Gemini connections at startup so the first request doesn't pay the cold start
+WARMUP_ON_START = os.getenv("JARVIS_WARMUP", "1") == "1"
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -57,6 +60,11 @@ async def lifespan(app: FastAPI):
         logger.info("Continuing without memory system")
         memory_system = None
     
+    # Warm up in the background - startup doesn't wait on the network
+    warmup_task = None
+    if WARMUP_ON_START:
+        warmup_task = asyncio.create_task(leonardo_agent.warmup())
+    
     logger.info("Steve Connect startup complete")
     logger.info("API Documentation: http://localhost:8000/docs")
     logger.info("Frontend Demo: http://localhost:8000/")
@@ -66,6 +74,9 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Starting Steve Connect shutdown")
     
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    
     # Force save memory before shutdown
     if memory_system:
         try:
@@ -74,6 +85,12 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"Error saving memory during shutdown: {str(e)}")
     
+    # Close the Gmail MCP session kept open between sends
+    try:
+        await email_sender.aclose()
+    except Exception as e:
+        logger.error(f"Error closing Gmail MCP session: {str(e)}")
+    
     logger.info("Steve Connect shutdown complete")
 
 # Initialize FastAPI app with lifespan
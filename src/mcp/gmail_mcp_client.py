@@ -17,10 +17,17 @@ import requests
 import time
 from typing import Dict, Any, Optional
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.tools import load_mcp_tools
 from dotenv import load_dotenv, set_key, find_dotenv
+from src.utils.logger import get_logger
 
 load_dotenv()
 
+logger = get_logger("gmail_mcp")
+
+# Resolved once per process - shutil.which stats every PATH entry on each call
+NPX_PATH = shutil.which("npx")
+
 class GmailMCPClient:
     """
     Professional MCP client with automatic token refresh - NO MORE MANUAL STEPS!
@@ -30,8 +37,17 @@ class GmailMCPClient:
         self.client = None
         self.is_connected = False
         
+        # Persistent MCP session (non-Windows) - without it every get_tools() and every
+        # tool call spawns a fresh npx server process and repeats the MCP handshake
+        self._tools: Dict[str, Any] = {}
+        self._session_task: Optional[asyncio.Task] = None
+        self._session_closed: Optional[asyncio.Event] = None
+        self._connect_lock = asyncio.Lock()
+        # In-flight token refresh shared by concurrent senders
+        self._refresh_task: Optional[asyncio.Future] = None
+        
         # Find npx path
-        self.npx_path = shutil.which("npx")
+        self.npx_path = NPX_PATH
         
         # Create dedicated thread pool for MCP operations (XX)
         self.mcp_executor = concurrent.futures.ThreadPoolExecutor(
@@ -48,9 +64,9 @@ class GmailMCPClient:
                     "transport": "stdio"
                 }
             }
-            print(f"Gmail MCP Client initialized with automatic token refresh (npx: {self.npx_path})")
+            logger.info("Gmail MCP Client initialized with automatic token refresh (npx: %s)", self.npx_path)
         else:
-            print("Warning: npx not found, MCP will fail")
+            logger.warning("npx not found, MCP will fail")
             self.mcp_config = {}
         
         # Gmail credentials from ,env
@@ -66,8 +82,21 @@ class GmailMCPClient:
         self.last_token_refresh = 0
         self.token_expiry_buffer = 300  # Refresh 5 minutes before expiry
         
-        print(f"Gmail credentials loaded: {bool(self.gmail_credentials['google_access_token'])}")
-        print("Automatic token refresh enabled - no more manual steps!")
+        logger.info("Gmail credentials loaded: %s", bool(self.gmail_credentials['google_access_token']))
+        logger.info("Automatic token refresh enabled - no more manual steps!")
+    
+    _shared: Optional["GmailMCPClient"] = None
+    
+    @classmethod
+    def get_shared(cls) -> "GmailMCPClient":
+        """
+        Process-wide client, so every EmailSender sends over the same MCP session
+        (one npx server process) instead of each starting its own
+        Creation is synchronous, so there is no race on the event loop
+        """
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
     
     def __del__(self):
         """Cleanup thread pool on destruction"""
@@ -76,17 +105,65 @@ class GmailMCPClient:
     
     async def connect(self) -> bool:
         """Connect using isolated event loop for Windows compatibility"""
-        if sys.platform == "win32":
-            print("Using isolated Windows-compatible event loop for MCP connection...")
-            return await self._run_mcp_operation(self._connect_internal)
-        else:
-            print("Using direct connection on non-Windows platform...")
-            return await self._connect_internal()
+        # Concurrent senders wait for one connection instead of each starting a server
+        async with self._connect_lock:
+            if self.is_connected:
+                return True
+            if sys.platform == "win32":
+                logger.debug("Using isolated Windows-compatible event loop for MCP connection...")
+                return await self._run_mcp_operation(self._connect_internal)
+            else:
+                logger.debug("Using direct connection on non-Windows platform...")
+                return await self._connect_internal()
+    
+    async def aclose(self):
+        """Shut down the persistent MCP session (and its npx server process)"""
+        if self._session_task is not None:
+            self._session_closed.set()
+            await asyncio.gather(self._session_task, return_exceptions=True)
+            self._session_task = None
+        self._tools = {}
+        self.is_connected = False
+    
+    async def _open_session(self) -> list:
+        """
+        Start the long-lived MCP session and return its tools
+        The session is entered and exited by one background task, since the stdio
+        transport's task group must be closed from the task that opened it
+        """
+        ready = asyncio.get_running_loop().create_future()
+        self._session_closed = asyncio.Event()
+        self._session_task = asyncio.create_task(self._hold_session(ready))
+        return await ready
+    
+    async def _hold_session(self, ready: asyncio.Future):
+        try:
+            async with self.client.session("gmail") as session:
+                tools = await load_mcp_tools(session)
+                self._tools = {tool.name: tool for tool in tools}
+                ready.set_result(tools)
+                await self._session_closed.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.warning("MCP session closed with error: %s", e)
+        finally:
+            # Session gone (closed or server died) - the next send reconnects
+            self._tools = {}
+            self.is_connected = False
+            self._session_task = None
+    
+    async def _get_tools(self) -> Dict[str, Any]:
+        """Tools by name - from the persistent session when there is one"""
+        if self._tools:
+            return self._tools
+        return {tool.name: tool for tool in await self.client.get_tools()}
     
     async def send_email(self, recipient: str, subject: str, body: str, html_body: str = None) -> Dict[str, Any]:
         """Send email with automatic token refresh - NO MANUAL INTERVENTION NEEDED!"""
         if not self.is_connected:
-            print("Not connected, attempting to connect...")
+            logger.info("Not connected, attempting to connect...")
             connect_result = await self.connect()
             if not connect_result:
                 return {"success": False, "error": "Failed to connect to MCP server"}
@@ -108,14 +185,14 @@ class GmailMCPClient:
         max_retries = 2
         for attempt in range(max_retries):
             try:
-                print(f"Attempt {attempt + 1}: Sending email to {recipient}")
+                logger.info("Attempt %s: Sending email to %s", attempt + 1, recipient)
                 
                 # added proactive token refresh check
                 if self._should_refresh_token():
-                    print("Proactively refreshing token...")
+                    logger.info("Proactively refreshing token...")
                     refresh_result = await self._refresh_access_token()
                     if not refresh_result["success"]:
-                        print(f"Proactive token refresh failed: {refresh_result['error']}")
+                        logger.warning("Proactive token refresh failed: %s", refresh_result['error'])
                         # Continue anyway, maybe the token is still valid
                 
                 # Try to send email
@@ -123,24 +200,24 @@ class GmailMCPClient:
                 
                 # If successful, return immediately, sometimes timeout errors are there
                 if result["success"]:
-                    print("Email sent successfully!")
+                    logger.info("Email sent successfully!")
                     return result
                 
                 # CHANGE: Added authentication error detection and auto-refres for the errors
                 error_msg = result.get("error", "").lower()
                 if any(auth_error in error_msg for auth_error in ["401", "403", "unauthorized", "invalid_grant", "token", "auth"]):
-                    print(f"Authentication error detected: {result['error']}")
+                    logger.warning("Authentication error detected: %s", result['error'])
                     
                     if attempt < max_retries - 1:  
-                        print("Attempting automatic token refresh...")
+                        logger.info("Attempting automatic token refresh...")
                         refresh_result = await self._refresh_access_token()
                         
                         if refresh_result["success"]:
-                            print("Token refreshed successfully! Retrying email send...")
+                            logger.info("Token refreshed successfully! Retrying email send...")
                             
                             continue
                         else:
-                            print(f"Automatic token refresh failed: {refresh_result['error']}")
+                            logger.error("Automatic token refresh failed: %s", refresh_result['error'])
                             return {
                                 "success": False,
                                 "error": f"Authentication failed and token refresh failed: {refresh_result['error']}"
@@ -155,7 +232,7 @@ class GmailMCPClient:
                     return result
                     
             except Exception as e:
-                print(f"Attempt {attempt + 1} failed with exception: {e}")
+                logger.error("Attempt %s failed with exception: %s", attempt + 1, e)
                 if attempt == max_retries - 1:
                     return {"success": False, "error": f"All attempts failed: {str(e)}"}
         
@@ -174,9 +251,22 @@ class GmailMCPClient:
     async def _refresh_access_token(self) -> Dict[str, Any]:
         """
         Automatically refresh access token using refresh token - NO BROWSER NEEDED!
+        Concurrent senders that all find the token stale share a single refresh
+        request to Google instead of each sending their own
         """
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.ensure_future(self._request_new_access_token())
+            self._refresh_task.add_done_callback(self._clear_refresh_task)
+        # shield - one sender being cancelled must not cancel the refresh the others wait on
+        return await asyncio.shield(self._refresh_task)
+    
+    def _clear_refresh_task(self, _task: asyncio.Future):
+        self._refresh_task = None
+    
+    async def _request_new_access_token(self) -> Dict[str, Any]:
+        """Single refresh round-trip - the blocking HTTP call runs in a worker thread"""
         try:
-            print("Starting automatic token refresh...")
+            logger.info("Starting automatic token refresh...")
             
             if not self.gmail_credentials["google_refresh_token"]:
                 return {"success": False, "error": "No refresh token available"}
@@ -189,10 +279,11 @@ class GmailMCPClient:
                 "grant_type": "refresh_token"
             }
             
-            print("Making token refresh request to Google...")
+            logger.debug("Making token refresh request to Google...")
             
             # Make refresh request to Google's OAuth2 endpoint
-            response = requests.post(
+            response = await asyncio.to_thread(
+                requests.post,
                 self.token_refresh_url,
                 data=refresh_data,
                 headers={"Content-Type": "application/x-www-form-urlencoded"},
@@ -204,7 +295,7 @@ class GmailMCPClient:
                 new_access_token = token_data.get("access_token")
                 
                 if new_access_token:
-                    print("New access token received!")
+                    logger.info("New access token received!")
                     
                     #  Update credentials in memory
                     self.gmail_credentials["google_access_token"] = new_access_token
@@ -214,12 +305,12 @@ class GmailMCPClient:
                     env_path = find_dotenv()
                     if env_path:
                         set_key(env_path, "GOOGLE_ACCESS_TOKEN", new_access_token)
-                        print("Updated .env file with new access token")
+                        logger.info("Updated .env file with new access token")
                     
                     # udate environment variable for current session
                     os.environ["GOOGLE_ACCESS_TOKEN"] = new_access_token
                     
-                    print("Token refresh completed successfully - fully automated!")
+                    logger.info("Token refresh completed successfully - fully automated!")
                     return {
                         "success": True,
                         "new_access_token": new_access_token,
@@ -229,7 +320,7 @@ class GmailMCPClient:
                     return {"success": False, "error": "No access token in refresh response"}
             else:
                 error_detail = response.text
-                print(f"Token refresh failed: {response.status_code} - {error_detail}")
+                logger.error("Token refresh failed: %s - %s", response.status_code, error_detail)
                 
                 # CCheck for specific error types to provide better error messages
                 if "invalid_grant" in error_detail:
@@ -245,10 +336,10 @@ class GmailMCPClient:
                     }
                     
         except requests.RequestException as e:
-            print(f"Network error during token refresh: {e}")
+            logger.error("Network error during token refresh: %s", e)
             return {"success": False, "error": f"Network error during token refresh: {str(e)}"}
         except Exception as e:
-            print(f"Unexpected error during token refresh: {e}")
+            logger.error("Unexpected error during token refresh: %s", e)
             return {"success": False, "error": f"Unexpected error during token refresh: {str(e)}"}
     
     async def _run_mcp_operation(self, operation, *args):
@@ -263,7 +354,7 @@ class GmailMCPClient:
                 asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
                 loop = asyncio.new_event_loop()
                 asyncio.set_event_loop(loop)
-                print(f"Created isolated event loop: {loop.__class__.__name__}")
+                logger.debug("Created isolated event loop: %s", loop.__class__.__name__)
             else:
                 loop = asyncio.new_event_loop()
                 asyncio.set_event_loop(loop)
@@ -272,9 +363,7 @@ class GmailMCPClient:
                 # Run the MCP operation in the isolated event loop
                 return loop.run_until_complete(operation(*args))
             except Exception as e:
-                print(f"Error in isolated MCP operation: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("Error in isolated MCP operation: %s", e)
                 raise
             finally:
                 # Clean up the event loop
@@ -297,38 +386,40 @@ class GmailMCPClient:
         """Internal connection method - runs in isolated event loop"""
         try:
             if not self.npx_path:
-                print("Cannot connect: npx not found")
+                logger.error("Cannot connect: npx not found")
                 return False
             
             # Validate credentials before connecting
             if not self.gmail_credentials["google_access_token"]:
-                print("Error: Missing GOOGLE_ACCESS_TOKEN in environment variables")
+                logger.error("Missing GOOGLE_ACCESS_TOKEN in environment variables")
                 return False
             
-            print("Connecting to MCP Gmail server...")
-            print(f"Using config: {self.mcp_config}")
+            logger.info("Connecting to MCP Gmail server...")
+            logger.debug("Using config: %s", self.mcp_config)
             
             self.client = MultiServerMCPClient(self.mcp_config)
             
             # Get available tools to test connection
-            print("Fetching available tools...")
-            tools = await self.client.get_tools()
+            logger.debug("Fetching available tools...")
+            if sys.platform == "win32":
+                # Each operation runs on its own short-lived event loop, so no session can outlive it
+                tools = await self.client.get_tools()
+            else:
+                tools = await self._open_session()
             tool_names = [tool.name for tool in tools]
-            print(f"MCP connected! Available tools: {tool_names}")
+            logger.info("MCP connected! Available tools: %s", tool_names)
             
             # Verify gmail_send_email tool exists
             if "gmail_send_email" not in tool_names:
-                print(f"Warning: gmail_send_email tool not found in: {tool_names}")
+                logger.warning("gmail_send_email tool not found in: %s", tool_names)
+                await self.aclose()
                 return False
             
             self.is_connected = True
             return True
             
         except Exception as e:
-            print(f"MCP connection failed: {e}")
-            print(f"Error type: {type(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("MCP connection failed: %s", e)
             self.is_connected = False
             return False
     
@@ -350,35 +441,30 @@ class GmailMCPClient:
             if html_body:
                 email_data["html_body"] = html_body
             
-            print(f"Email data prepared: to={recipient}, subject={subject}")
+            logger.debug("Email data prepared: to=%s, subject=%s", recipient, subject)
             
             # Get tools and find the exact gmail_send_email tool
-            tools = await self.client.get_tools()
-            send_tool = None
-            
-            for tool in tools:
-                if tool.name == "gmail_send_email":
-                    send_tool = tool
-                    break
+            tools = await self._get_tools()
+            send_tool = tools.get("gmail_send_email")
             
             if not send_tool:
-                available_tools = [tool.name for tool in tools]
+                available_tools = list(tools)
                 return {
                     "success": False, 
                     "error": f"gmail_send_email tool not found. Available tools: {available_tools}"
                 }
             
             # Send the email using the correct tool
-            print(f"Invoking {send_tool.name} with email data...")
+            logger.debug("Invoking %s with email data...", send_tool.name)
             result = await send_tool.ainvoke(email_data)
             
-            print(f"MCP tool result: {result}")
+            logger.debug("MCP tool result: %s", result)
             
             # Parse JSON string response if needed
             if isinstance(result, str):
                 try:
                     result = json.loads(result)
-                    print(f"Parsed JSON result: {result}")
+                    logger.debug("Parsed JSON result: %s", result)
                 except json.JSONDecodeError:
                     return {"success": False, "error": f"Invalid JSON response: {result}"}
             
@@ -410,9 +496,9 @@ class GmailMCPClient:
             }
             
         except Exception as e:
-            print(f"MCP email send error: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("MCP email send error: %s", e)
+            # The session may be broken - drop it so the next send reconnects
+            await self.aclose()
             return {"success": False, "error": str(e)}
     
     # CHANGE: Enhanced get_recent_emails method with automatic token refresh support
@@ -426,13 +512,8 @@ class GmailMCPClient:
     async def _get_recent_emails_internal(self, max_results: int = 5) -> Dict[str, Any]:
         """Internal get recent emails method - runs in isolated event loop"""
         try:
-            tools = await self.client.get_tools()
-            get_emails_tool = None
-            
-            for tool in tools:
-                if tool.name == "gmail_get_recent_emails":
-                    get_emails_tool = tool
-                    break
+            tools = await self._get_tools()
+            get_emails_tool = tools.get("gmail_get_recent_emails")
             
             if not get_emails_tool:
                 return {"success": False, "error": "gmail_get_recent_emails tool not found"}
@@ -456,5 +537,5 @@ class GmailMCPClient:
             return {"success": True, "emails": result}
             
         except Exception as e:
-            print(f"Get emails error: {e}")
+            logger.error("Get emails error: %s", e)
             return {"success": False, "error": str(e)}
\ No newline at end of file
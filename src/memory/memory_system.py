@@ -10,6 +10,9 @@ from typing import Dict, Any, Optional, List
 from src.agents.story_writer_agent import StoryWriterAgent
 from src.memory.vector_memory_manager import VectorMemoryManager
 from src.agents.memory_retrieval_agent import MemoryRetrievalAgent
+from src.utils.logger import get_logger
+
+logger = get_logger("memory_system")
 
 class MemorySystem:
     """
@@ -20,7 +23,7 @@ class MemorySystem:
         """
         Initialize the complete memory system
         """
-        print("Initializing Memory System...")
+        logger.info("Initializing Memory System...")
         
         # Initialize components
         self.vector_manager = VectorMemoryManager(storage_path=storage_path)
@@ -29,7 +32,7 @@ class MemorySystem:
         
         self.initialized = True
         
-        print(f"Memory System initialized with {self.vector_manager.story_count} existing stories")
+        logger.info("Memory System initialized with %d existing stories", self.vector_manager.story_count)
     
     async def record_app_action(self, 
                                app_name: str,
@@ -64,28 +67,28 @@ class MemorySystem:
             }
             
             # Generate story using Story Writer Agent
-            print(f"Recording action: {app_name}.{action}")
+            logger.info("Recording action: %s.%s", app_name, action)
             story_result = await self.story_writer.write_story(
                 event_data=event_data,
                 session_context=session_context
             )
             
             if not story_result.get('success', False):
-                print(f"Failed to write story: {story_result.get('error', 'Unknown error')}")
+                logger.warning("Failed to write story: %s", story_result.get('error', 'Unknown error'))
                 return False
             
             # Store story in vector memry
             storage_success = await self.vector_manager.add_story(story_result)
             
             if storage_success:
-                print(f"Action recorded in memory: {story_result['story_id']}")
+                logger.info("Action recorded in memory: %s", story_result['story_id'])
                 return True
             else:
-                print(f"Failed to store story in vector memory")
+                logger.warning("Failed to store story in vector memory")
                 return False
                 
         except Exception as e:
-            print(f"Error recording app action: {e}")
+            logger.error("Error recording app action: %s", e)
             return False
     
     async def get_context_for_chat(self, 
@@ -109,7 +112,7 @@ class MemorySystem:
             }
         """
         try:
-            print(f"Retrieving context for: '{user_message[:50]}...'")
+            logger.info("Retrieving context for: '%.50s...'", user_message)
             
             # Get relevant context using Memory Retrieval Agent
             context_result = await self.memory_retriever.get_relevant_context(
@@ -121,9 +124,9 @@ class MemorySystem:
             has_context = len(context_result.get('relevant_stories', [])) > 0
             
             if has_context:
-                print(f"Found {context_result['stories_found']} relevant stories")
+                logger.info("Found %s relevant stories", context_result['stories_found'])
             else:
-                print("No relevant stories found in memory")
+                logger.info("No relevant stories found in memory")
             
             return {
                 'has_context': has_context,
@@ -137,7 +140,7 @@ class MemorySystem:
             }
             
         except Exception as e:
-            print(f"Error retrieving chat context: {e}")
+            logger.error("Error retrieving chat context: %s", e)
             return {
                 'has_context': False,
                 'context_summary': '',
@@ -164,7 +167,7 @@ class MemorySystem:
             }
             
         except Exception as e:
-            print(f"Error getting project summary: {e}")
+            logger.error("Error getting project summary: %s", e)
             return {
                 'project_name': project_name,
                 'total_activities': 0,
@@ -202,7 +205,7 @@ class MemorySystem:
                 filters=filters
             )
         except Exception as e:
-            print(f"Error searching memories: {e}")
+            logger.error("Error searching memories: %s", e)
             return []
     
     def force_save_memory(self):
@@ -211,16 +214,16 @@ class MemorySystem:
         """
         try:
             self.vector_manager.force_save()
-            print("Memory forced to disk")
+            logger.info("Memory forced to disk")
         except Exception as e:
-            print(f"Error force saving memory: {e}")
+            logger.error("Error force saving memory: %s", e)
     
     async def test_memory_system(self) -> Dict[str, Any]:
         """
         Test the memory system with a sample action (useful for debugging)
         """
         try:
-            print("Testing memory system...")
+            logger.info("Testing memory system...")
             
             # Test recording an action
             test_success = await self.record_app_action(
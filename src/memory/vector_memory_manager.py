@@ -6,6 +6,8 @@ Uses FAISS for local vector storage with Google Embeddings API
 
 import os
 import json
+import asyncio
+import heapq
 import pickle
 from datetime import datetime
 from typing import Dict, Any, List, Optional, Tuple
@@ -15,9 +17,35 @@ from pathlib import Path
 from google.generativeai import embed_content
 import google.generativeai as genai
 from dotenv import load_dotenv
+from src.utils.logger import get_logger
+
+logger = get_logger("vector_memory")
+
+# Optional: orjson (de)serializes the metadata/story files several times faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 load_dotenv()
 
+
+def _read_json(path: Path):
+    """Load a JSON file, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_json(path: Path, data):
+    """Write a JSON file (2-space indent, UTF-8), with orjson when it is installed"""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
 class VectorMemoryManager:
     """
     Manages vector storage and retrieval of user stories using FAISS
@@ -45,6 +73,14 @@ class VectorMemoryManager:
         self.embedding_dimension = 768  # Google's text-embedding dimension
         self.max_stories = 10000  # Maximum stories to store
         
+        # Write-behind persistence - every save rewrites the whole index and JSON files,
+        # so new stories are flushed in groups (by count or age) instead of one by one
+        self.flush_every = int(os.getenv("JARVIS_MEMORY_FLUSH_EVERY", "16"))
+        self.flush_interval = float(os.getenv("JARVIS_MEMORY_FLUSH_SECONDS", "30"))
+        self._unsaved_count = 0
+        # Fires flush_interval after the oldest unsaved story, even if no more stories arrive
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        
         # Initialize or load existing index
         self.index = None
         self.stories_metadata = []
@@ -53,7 +89,7 @@ class VectorMemoryManager:
         
         self._initialize_storage()
         
-        print(f"Vector Memory Manager initialized with {self.story_count} existing stories")
+        logger.info("Vector Memory Manager initialized with %d existing stories", self.story_count)
     
     def _initialize_storage(self):
         """
@@ -78,7 +114,7 @@ class VectorMemoryManager:
         self.stories_text = []
         self.story_count = 0
         
-        print("Created new vector memory storage")
+        logger.info("Created new vector memory storage")
     
     def _load_existing_storage(self):
         """
@@ -89,20 +125,18 @@ class VectorMemoryManager:
             self.index = faiss.read_index(str(self.index_path))
             
             # Load metadata
-            with open(self.metadata_path, 'r', encoding='utf-8') as f:
-                self.stories_metadata = json.load(f)
+            self.stories_metadata = _read_json(self.metadata_path)
             
             # Load story texts
-            with open(self.stories_path, 'r', encoding='utf-8') as f:
-                self.stories_text = json.load(f)
+            self.stories_text = _read_json(self.stories_path)
             
             self.story_count = len(self.stories_metadata)
             
-            print(f"Loaded existing vector memory with {self.story_count} stories")
+            logger.info("Loaded existing vector memory with %d stories", self.story_count)
             
         except Exception as e:
-            print(f"Error loading existing storage: {e}")
-            print("Creating new storage...")
+            logger.error("Error loading existing storage: %s", e)
+            logger.info("Creating new storage...")
             self._create_new_storage()
     
     def _save_storage(self):
@@ -114,17 +148,47 @@ class VectorMemoryManager:
             faiss.write_index(self.index, str(self.index_path))
             
             # Save metadata
-            with open(self.metadata_path, 'w', encoding='utf-8') as f:
-                json.dump(self.stories_metadata, f, indent=2, ensure_ascii=False)
+            _write_json(self.metadata_path, self.stories_metadata)
             
             # Save story texts
-            with open(self.stories_path, 'w', encoding='utf-8') as f:
-                json.dump(self.stories_text, f, indent=2, ensure_ascii=False)
+            _write_json(self.stories_path, self.stories_text)
+            
+            self._unsaved_count = 0
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
             
         except Exception as e:
-            print(f"Error saving storage: {e}")
+            logger.error("Error saving storage: %s", e)
+    
+    def _mark_unsaved(self):
+        """
+        Record a new in-memory story and flush once enough have piled up or the oldest is stale
+        """
+        self._unsaved_count += 1
+        if self._unsaved_count >= self.flush_every:
+            self._save_storage()
+        elif self._flush_timer is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                # No event loop to time the flush - the count and shutdown still flush
+                return
+            self._flush_timer = loop.call_later(self.flush_interval, self._flush_due)
+    
+    def _flush_due(self):
+        """Timer callback - the oldest unsaved story has waited flush_interval seconds"""
+        self._flush_timer = None
+        self.flush()
+    
+    def flush(self):
+        """
+        Write pending stories to disk (no-op when everything is already saved)
+        """
+        if self._unsaved_count:
+            self._save_storage()
     
-    async def add_story(self, story_data: Dict[str, Any]) -> bool:
+    async def add_story(self, story_data: Dict[str, Any], persist: bool = True) -> bool:
         """
         Add a new story to vector memory
         
@@ -134,6 +198,8 @@ class VectorMemoryManager:
                 'metadata': {...},
                 'story_id': 'unique_id'
             }
+            persist: Count the story towards the next batched flush to disk
+                (False when the caller saves once itself, e.g. add_batch_stories)
         
         Returns:
             bool: Success status
@@ -144,7 +210,7 @@ class VectorMemoryManager:
             story_id = story_data.get('story_id', f"story_{len(self.stories_text)}")
             
             if not story_text:
-                print("Warning: Empty story text, skipping...")
+                logger.warning("Empty story text, skipping...")
                 return False
             
             # Generate embedding
@@ -170,14 +236,17 @@ class VectorMemoryManager:
             self.stories_text.append(story_text)
             self.story_count += 1
             
-            # Save to disk after every story for immediate persistence
-            self._save_storage()
+            # Persisted in batches - see flush_every / flush_interval
+            if persist:
+                self._mark_unsaved()
+            else:
+                self._unsaved_count += 1
             
-            print(f"Added story to vector memory: {story_id} (saved to disk)")
+            logger.info("Added story to vector memory: %s", story_id)
             return True
             
         except Exception as e:
-            print(f"Error adding story to vector memory: {e}")
+            logger.error("Error adding story to vector memory: %s", e)
             return False
     
     async def search_stories(self, 
@@ -241,7 +310,7 @@ class VectorMemoryManager:
             return results
             
         except Exception as e:
-            print(f"Error searching stories: {e}")
+            logger.error("Error searching stories: %s", e)
             return []
     
     async def search_by_timeframe(self, 
@@ -253,28 +322,32 @@ class VectorMemoryManager:
         try:
             cutoff_date = datetime.now().timestamp() - (days_back * 24 * 60 * 60)
             
-            recent_stories = []
+            # Only (timestamp, index) pairs are collected - result dicts are built for the top_k alone
+            recent = []
             for i, metadata in enumerate(self.stories_metadata):
                 story_timestamp = metadata.get('timestamp', '')
                 if story_timestamp:
                     try:
                         story_time = datetime.fromisoformat(story_timestamp.replace('Z', '+00:00')).timestamp()
                         if story_time >= cutoff_date:
-                            recent_stories.append({
-                                'story_text': self.stories_text[i],
-                                'metadata': metadata,
-                                'similarity_score': 1.0,  # Perfect match for time-based queries
-                                'rank': len(recent_stories) + 1
-                            })
+                            recent.append((story_timestamp, i))
                     except:
                         continue
             
-            # Sort by timestamp (newest first) and limit
-            recent_stories.sort(key=lambda x: x['metadata'].get('timestamp', ''), reverse=True)
-            return recent_stories[:top_k]
+            # Newest top_k without sorting every recent story
+            newest = heapq.nlargest(top_k, recent, key=lambda entry: entry[0])
+            return [
+                {
+                    'story_text': self.stories_text[i],
+                    'metadata': self.stories_metadata[i],
+                    'similarity_score': 1.0,  # Perfect match for time-based queries
+                    'rank': rank
+                }
+                for rank, (_, i) in enumerate(newest, start=1)
+            ]
             
         except Exception as e:
-            print(f"Error searching by timeframe: {e}")
+            logger.error("Error searching by timeframe: %s", e)
             return []
     
     async def search_by_project(self, 
@@ -313,7 +386,7 @@ class VectorMemoryManager:
             return result['embedding']
             
         except Exception as e:
-            print(f"Error generating embedding: {e}")
+            logger.error("Error generating embedding: %s", e)
             return None
     
     def get_memory_stats(self) -> Dict[str, Any]:
@@ -353,9 +426,8 @@ class VectorMemoryManager:
         # Date range
         date_range = 'No dates available'
         if timestamps:
-            timestamps.sort()
-            start_date = timestamps[0][:10]  # Just the date part
-            end_date = timestamps[-1][:10]
+            start_date = min(timestamps)[:10]  # Just the date part
+            end_date = max(timestamps)[:10]
             date_range = f"{start_date} to {end_date}"
         
         return {
@@ -371,14 +443,14 @@ class VectorMemoryManager:
         Force save current state to disk
         """
         self._save_storage()
-        print("Memory storage saved to disk")
+        logger.info("Memory storage saved to disk")
     
     def clear_memory(self, confirm: bool = False):
         """
         Clear all stored memories (use with caution!)
         """
         if not confirm:
-            print("Use clear_memory(confirm=True) to actually clear the memory")
+            logger.warning("Use clear_memory(confirm=True) to actually clear the memory")
             return
         
         # Remove files
@@ -389,7 +461,7 @@ class VectorMemoryManager:
         # Reset in-memory storage
         self._create_new_storage()
         
-        print("All memory storage cleared!")
+        logger.info("All memory storage cleared!")
     
     async def add_batch_stories(self, stories: List[Dict[str, Any]]) -> int:
         """
@@ -398,11 +470,11 @@ class VectorMemoryManager:
         success_count = 0
         
         for story in stories:
-            if await self.add_story(story):
+            if await self.add_story(story, persist=False):
                 success_count += 1
         
-        # Force save after batch
-        self._save_storage()
+        # One save for the whole batch
+        self.flush()
         
-        print(f"Added {success_count}/{len(stories)} stories to memory")
+        logger.info("Added %d/%d stories to memory", success_count, len(stories))
         return success_count
\ No newline at end of file
@@ -0,0 +1,83 @@
+# src/utils/circuit_breaker.py
+"""
+Minimal circuit breaker for calls to external APIs
+After fail_max consecutive failures the breaker opens and callers skip the
+call entirely; once reset_timeout seconds pass one trial call is let through
+and its outcome closes or re-opens the breaker
+"""
+
+import time
+from typing import Optional
+
+from src.utils.logger import get_logger
+
+logger = get_logger("circuit_breaker")
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker (closed -> open -> half-open)
+    Plain counters, no locking - meant for a single asyncio event loop
+    Callers check is_open to skip work, and claim the call itself with allow_request
+    """
+
+    __slots__ = ("name", "fail_max", "reset_timeout", "_failures", "_opened_at", "_trial_started_at")
+
+    def __init__(self, name: str, fail_max: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_started_at: Optional[float] = None
+
+    @property
+    def is_closed(self) -> bool:
+        """True while calls flow normally (no half-open trial pending)"""
+        return self._opened_at is None
+
+    @property
+    def is_open(self) -> bool:
+        """
+        True while calls should be skipped
+        After reset_timeout the breaker is half-open: False until one caller claims the
+        trial through allow_request, then True for everyone else until it reports back
+        """
+        if self._opened_at is None:
+            return False
+        now = time.monotonic()
+        if now - self._opened_at < self.reset_timeout:
+            return True
+        # A trial that never reported back (e.g. its caller died) stops blocking after reset_timeout
+        return self._trial_started_at is not None and now - self._trial_started_at < self.reset_timeout
+
+    def allow_request(self) -> bool:
+        """
+        Claim the right to make a call - always granted while closed, granted to
+        exactly one caller while half-open
+        """
+        if self.is_open:
+            return False
+        if self._opened_at is not None:
+            self._trial_started_at = time.monotonic()
+        return True
+
+    def release_trial(self):
+        """Give up a claimed trial without an outcome (e.g. the call was cancelled)"""
+        self._trial_started_at = None
+
+    def record_success(self):
+        if self._opened_at is not None:
+            logger.info("%s circuit breaker closed after a successful trial call", self.name)
+        self._failures = 0
+        self._opened_at = None
+        self._trial_started_at = None
+
+    def record_failure(self):
+        self._failures += 1
+        self._trial_started_at = None
+        # A failed trial call re-opens the breaker for another reset_timeout
+        if self._failures >= self.fail_max:
+            self._opened_at = time.monotonic()
+            logger.warning("%s circuit breaker open for %ss after %d failures",
+                           self.name, self.reset_timeout, self._failures)
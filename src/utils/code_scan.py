@@ -0,0 +1,75 @@
+# src/utils/code_scan.py
+"""
+Fast scans over generated code
+Counts lines and emoji characters (the prompt forbids emojis in generated apps)
+Uses Numba when it is installed and JARVIS_NUMBA isn't "0", plain Python otherwise
+"""
+
+import os
+import re
+from typing import Tuple
+
+_NEWLINE = 0x0A
+# Code point ranges the emoji live in - pictographs/emoticons/symbols & pictographs
+# (incl. mahjong, cards and enclosed alphanumerics), misc symbols and dingbats (e.g. ☀ ✅ ✨ ❤),
+# and misc symbols and arrows (e.g. ⭐ ⬆)
+_EMOJI_RANGES = (
+    (0x1F000, 0x1FAFF),
+    (0x2600, 0x27BF),
+    (0x2B00, 0x2BFF)
+)
+_EMOJI_RE = re.compile("[" + "".join(f"{chr(low)}-{chr(high)}" for low, high in _EMOJI_RANGES) + "]")
+
+_count_lines_and_emoji = None
+
+if os.getenv("JARVIS_NUMBA", "1") == "1":
+    try:
+        import numpy as np
+        from numba import njit
+
+        _RANGES = np.array(_EMOJI_RANGES, dtype=np.uint32)
+
+        # cache=True stores the compiled function on disk so restarts don't recompile
+        @njit(cache=True)
+        def _count_lines_and_emoji_numba(code_points, ranges):
+            lines = 0
+            emoji = 0
+            for cp in code_points:
+                if cp == _NEWLINE:
+                    lines += 1
+                    continue
+                for i in range(ranges.shape[0]):
+                    if ranges[i, 0] <= cp <= ranges[i, 1]:
+                        emoji += 1
+                        break
+            return lines, emoji
+
+        def _count_lines_and_emoji(text: str) -> Tuple[int, int]:
+            # UTF-32 gives one fixed-width integer per code point
+            code_points = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+            return _count_lines_and_emoji_numba(code_points, _RANGES)
+    except ImportError:
+        _count_lines_and_emoji = None
+
+
+def _count_lines_and_emoji_python(text: str) -> Tuple[int, int]:
+    """Pure-Python fallback - str.count and the regex scan both run in C so this is still a fast path"""
+    emoji = sum(1 for _ in _EMOJI_RE.finditer(text))
+    return text.count("\n"), emoji
+
+
+def count_lines_and_emoji(text: str) -> Tuple[int, int]:
+    """
+    Return (line_count, emoji_count) for a block of generated code
+    """
+    if not text:
+        return 0, 0
+
+    if _count_lines_and_emoji is not None:
+        newlines, emoji = _count_lines_and_emoji(text)
+    else:
+        newlines, emoji = _count_lines_and_emoji_python(text)
+
+    # A last line without a trailing newline still counts
+    line_count = newlines if text.endswith("\n") else newlines + 1
+    return int(line_count), int(emoji)
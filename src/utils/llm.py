@@ -0,0 +1,40 @@
+# src/utils/llm.py
+"""
+Shared Gemini clients
+Agents that use the same settings get the same client, so they share one
+connection pool to Gemini instead of each opening (and handshaking) their own
+"""
+
+import os
+from functools import lru_cache
+
+from dotenv import load_dotenv
+from google import genai
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+load_dotenv()
+
+# Read once at import - the key doesn't change while the process runs
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+
+@lru_cache(maxsize=None)
+def get_chat_llm(temperature: float, model: str = "gemini-2.0-flash") -> ChatGoogleGenerativeAI:
+    """
+    Get the process-wide chat client for this model and temperature
+    """
+    return ChatGoogleGenerativeAI(
+        model=model,
+        temperature=temperature,
+        google_api_key=GOOGLE_API_KEY,
+        convert_system_message_to_human=True
+    )
+
+
+@lru_cache(maxsize=None)
+def get_genai_client() -> genai.Client:
+    """
+    Get the process-wide google-genai client (used for image generation)
+    Its HTTP clients keep connections alive, so reusing it skips the TLS handshake
+    """
+    return genai.Client(api_key=GOOGLE_API_KEY)
@@ -4,8 +4,11 @@ Simple logging configuration for Steve Connect
 Basic file logging with timestamps - focused on functionality over infrastructure
 """
 
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 from datetime import datetime
 
 # Create logs directory
@@ -15,16 +18,34 @@ os.makedirs("logs", exist_ok=True)
 LOG_FILE = f"{datetime.now().strftime('%Y_%m_%d')}.log"
 LOG_FILE_PATH = os.path.join("logs", LOG_FILE)
 
+# File and console output run on a background thread - log calls from async code
+# only enqueue the record, so the event loop never blocks on disk/stdout writes
+_formatter = logging.Formatter("[%(asctime)s] %(name)s - %(levelname)s - %(message)s")
+_output_handlers = [
+    logging.FileHandler(LOG_FILE_PATH),
+    logging.StreamHandler()  # Also log to console for development
+]
+for _handler in _output_handlers:
+    _handler.setFormatter(_formatter)
+
+_log_queue = queue.SimpleQueue()
+_listener = logging.handlers.QueueListener(_log_queue, *_output_handlers)
+_listener.start()
+atexit.register(_listener.stop)  # flush anything still queued on exit
+
+# The queue side only renders the message text - the full format is applied by the output handlers
+_queue_handler = logging.handlers.QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter("%(message)s"))
+
 # Basic logging configuration
 logging.basicConfig(
     level=logging.INFO,
-    format="[%(asctime)s] %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE_PATH),
-        logging.StreamHandler()  # Also log to console for development
-    ]
+    handlers=[_queue_handler]
 )
 
 def get_logger(name: str) -> logging.Logger:
-    """Get a simple logger for the given module"""
+    """
+    Get a simple logger for the given module
+    Pass values as %-style args so messages are only formatted if the record is emitted
+    """
     return logging.getLogger(name)
\ No newline at end of file
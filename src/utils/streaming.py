@@ -0,0 +1,38 @@
+# src/utils/streaming.py
+"""
+Turns a callback-based generation into an async iterator of events
+Shared by the agents' *_streaming methods
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+
+TokenCallback = Callable[[str], None]
+
+
+async def stream_generation(
+    generate: Callable[[TokenCallback, TokenCallback], Awaitable[Any]]
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run generate(on_token, on_reset) as a task and yield what it reports as it happens:
+    {"type": "token", "content": chunk} for each on_token(chunk),
+    {"type": "reset", "error": message} when on_reset(message) says the tokens so far are void
+    (the tokens after it start over), then one {"type": "result", "result": ...}
+    generate must not raise - its return value is the result event
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    generation = asyncio.create_task(generate(
+        lambda chunk: events.put_nowait({"type": "token", "content": chunk}),
+        lambda error: events.put_nowait({"type": "reset", "error": error})
+    ))
+    # None marks the end of the event stream
+    generation.add_done_callback(lambda _: events.put_nowait(None))
+
+    try:
+        while (event := await events.get()) is not None:
+            yield event
+        yield {"type": "result", "result": generation.result()}
+    finally:
+        # Consumer went away mid-stream - stop generating
+        if not generation.done():
+            generation.cancel()
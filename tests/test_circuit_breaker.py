@@ -0,0 +1,124 @@
+# tests/test_circuit_breaker.py
+"""
+CircuitBreaker state transitions (closed -> open -> half-open -> closed/open)
+"""
+
+import pytest
+
+from src.utils import circuit_breaker
+from src.utils.circuit_breaker import CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.fail_max):
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+
+def test_stays_closed_below_fail_max(clock):
+    breaker = CircuitBreaker("test", fail_max=3, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    
+    assert breaker.is_closed
+    assert not breaker.is_open
+    assert breaker.allow_request()
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker("test", fail_max=3, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    
+    assert breaker.is_closed
+
+
+def test_opens_after_fail_max(clock):
+    breaker = CircuitBreaker("test", fail_max=3, reset_timeout=10)
+    open_breaker(breaker)
+    
+    assert breaker.is_open
+    assert not breaker.allow_request()
+    
+    clock.now += 9.9
+    assert breaker.is_open
+
+
+def test_half_open_lets_exactly_one_trial_through(clock):
+    breaker = CircuitBreaker("test", fail_max=3, reset_timeout=10)
+    open_breaker(breaker)
+    clock.now += 10
+    
+    assert not breaker.is_open
+    assert breaker.allow_request()
+    # Everyone else is held back while the trial is in flight
+    assert breaker.is_open
+    assert not breaker.allow_request()
+    assert not breaker.is_closed
+
+
+def test_successful_trial_closes(clock):
+    breaker = CircuitBreaker("test", fail_max=3, reset_timeout=10)
+    open_breaker(breaker)
+    clock.now += 10
+    assert breaker.allow_request()
+    
+    breaker.record_success()
+    
+    assert breaker.is_closed
+    assert breaker.allow_request()
+    assert breaker.allow_request()
+
+
+def test_failed_trial_reopens_for_another_timeout(clock):
+    breaker = CircuitBreaker("test", fail_max=3, reset_timeout=10)
+    open_breaker(breaker)
+    clock.now += 10
+    assert breaker.allow_request()
+    
+    breaker.record_failure()
+    
+    assert breaker.is_open
+    clock.now += 9.9
+    assert not breaker.allow_request()
+    clock.now += 0.1
+    assert breaker.allow_request()
+
+
+def test_released_trial_lets_the_next_caller_try(clock):
+    breaker = CircuitBreaker("test", fail_max=3, reset_timeout=10)
+    open_breaker(breaker)
+    clock.now += 10
+    assert breaker.allow_request()
+    
+    breaker.release_trial()
+    
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+
+def test_abandoned_trial_expires(clock):
+    breaker = CircuitBreaker("test", fail_max=3, reset_timeout=10)
+    open_breaker(breaker)
+    clock.now += 10
+    assert breaker.allow_request()
+    
+    clock.now += 10
+    assert breaker.allow_request()
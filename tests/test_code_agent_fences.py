@@ -0,0 +1,35 @@
+# tests/test_code_agent_fences.py
+"""
+Markdown fence stripping for generated app.py (_FENCE_RE via CodeAgent._clean_code_response)
+"""
+
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("tenacity")
+
+from src.agents.code_agent import CodeAgent
+
+CODE = 'import streamlit as st\n\nst.title("Budget")\n'
+
+
+@pytest.mark.parametrize("response", [
+    f"```python\n{CODE}```",
+    f"```py\n{CODE}```\n",
+    f"```\n{CODE}```",
+    f"  \n```python  \n{CODE}\n```  \n",
+    CODE
+])
+def test_strips_surrounding_fence(response):
+    assert CodeAgent._clean_code_response(response) == CODE.strip()
+
+
+def test_keeps_fences_inside_the_code():
+    # A fence inside a string literal is part of the app, not a wrapper
+    code = 'st.markdown("""\n```\nexample\n```\n""")\nst.write("done")'
+    
+    assert CodeAgent._clean_code_response(f"```python\n{code}\n```") == code
+
+
+def test_only_opening_fence():
+    assert CodeAgent._clean_code_response(f"```python\n{CODE}") == CODE.strip()
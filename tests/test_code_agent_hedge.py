@@ -0,0 +1,96 @@
+# tests/test_code_agent_hedge.py
+"""
+CodeAgent._generate_hedged - streamed Gemini chunks are voided when Gemini doesn't win
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("tenacity")
+
+from src.agents.code_agent import CodeAgent
+
+
+def make_agent(gemini, finetuned):
+    # CodeAgent has __slots__, so the providers are swapped in on a subclass
+    agent_cls = type("StubCodeAgent", (CodeAgent,), {
+        "_generate_with_gemini": staticmethod(gemini),
+        "_generate_with_finetuned": staticmethod(finetuned)
+    })
+    # Skip __init__ - it builds real model clients
+    agent = agent_cls.__new__(agent_cls)
+    agent.gemini_available = True
+    agent.finetuned_available = True
+    return agent
+
+
+def run_hedged(agent):
+    events = []
+    result = asyncio.run(agent._generate_hedged(
+        "Budget", "Track spending", "finance", "",
+        on_token=lambda chunk: events.append(("token", chunk)),
+        on_reset=lambda error: events.append(("reset", error))
+    ))
+    return result, events
+
+
+async def finetuned(*args):
+    return "fallback code"
+
+
+def test_gemini_failure_after_tokens_resets():
+    async def gemini(*args, on_token=None):
+        on_token("partial")
+        raise TimeoutError("stream timed out")
+    
+    result, events = run_hedged(make_agent(gemini, finetuned))
+    
+    assert result == ("fallback code", "kunalsahjwani/qwen-streamlit-coder")
+    assert events == [("token", "partial"), ("reset", "stream timed out")]
+
+
+def test_gemini_success_does_not_reset():
+    async def gemini(*args, on_token=None):
+        on_token("app code")
+        return "app code"
+    
+    result, events = run_hedged(make_agent(gemini, finetuned))
+    
+    assert result == ("app code", "gemini-2.0-flash")
+    assert events == [("token", "app code")]
+
+
+def test_losing_the_race_mid_stream_resets(monkeypatch):
+    monkeypatch.setattr("src.agents.code_agent._HEDGE_DELAY_SECONDS", 0)
+    
+    async def gemini(*args, on_token=None):
+        on_token("partial")
+        await asyncio.sleep(10)
+    
+    result, events = run_hedged(make_agent(gemini, finetuned))
+    
+    assert result[1] == "kunalsahjwani/qwen-streamlit-coder"
+    assert [kind for kind, _ in events] == ["token", "reset"]
+
+
+def test_cached_spec_is_served_while_breaker_is_open(monkeypatch):
+    from src.utils.circuit_breaker import CircuitBreaker
+    from src.utils.ttl_cache import TTLCache
+    
+    breaker = CircuitBreaker("Gemini", fail_max=1, reset_timeout=60)
+    breaker.record_failure()
+    monkeypatch.setattr(CodeAgent, "_gemini_breaker", breaker)
+    monkeypatch.setattr(CodeAgent, "_generation_cache", TTLCache(maxsize=8, ttl=60))
+    
+    agent = CodeAgent.__new__(CodeAgent)
+    agent.gemini_available = True
+    agent.finetuned_available = False
+    inputs = agent._prompt_inputs("Budget", "Track spending", "finance", "")
+    CodeAgent._generation_cache.set(agent._gemini_cache_key(inputs), "cached code")
+    
+    result, events = run_hedged(agent)
+    
+    assert result == ("cached code", "gemini-2.0-flash")
+    assert events == [("token", "cached code")]
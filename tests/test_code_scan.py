@@ -0,0 +1,42 @@
+# tests/test_code_scan.py
+"""
+Line and emoji counts over generated code
+"""
+
+import pytest
+
+from src.utils import code_scan
+from src.utils.code_scan import count_lines_and_emoji
+
+
+@pytest.fixture(params=["python", "numba"])
+def scan(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(code_scan, "_count_lines_and_emoji", None)
+    elif code_scan._count_lines_and_emoji is None:
+        pytest.skip("numba not installed")
+    return count_lines_and_emoji
+
+
+def test_empty(scan):
+    assert scan("") == (0, 0)
+
+
+def test_line_count_with_and_without_trailing_newline(scan):
+    assert scan("a\nb\n") == (2, 0)
+    assert scan("a\nb") == (2, 0)
+
+
+@pytest.mark.parametrize("emoji", ["😀", "🚀", "✅", "☀", "✨", "❤", "⭐"])
+def test_counts_emoji(scan, emoji):
+    assert scan(f'st.title("Done {emoji}")\n') == (1, 1)
+
+
+@pytest.mark.parametrize("text", [
+    "𠀀",  # CJK Extension B
+    "𝐀𝐁",  # mathematical alphanumerics
+    "naïve café – “quotes”",
+    "x = 1  # ä ö ü ß"
+])
+def test_ignores_other_non_ascii(scan, text):
+    assert scan(text) == (1, 0)
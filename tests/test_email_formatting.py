@@ -0,0 +1,44 @@
+# tests/test_email_formatting.py
+"""
+Single-pass email body formatter (_BODY_MARKUP_RE) against the original multi-pass one
+"""
+
+import re
+
+import pytest
+
+pytest.importorskip("langchain")
+
+from src.agents.email_agent import EmailAgent
+
+
+def legacy_format_email_body(body: str) -> str:
+    """The formatter as it was before the single regex pass"""
+    formatted_body = body.replace('\n\n', '</p><p style="margin-bottom: 15px;">')
+    formatted_body = formatted_body.replace('\n', '<br>')
+    formatted_body = f'<p style="margin-bottom: 15px;">{formatted_body}</p>'
+    formatted_body = re.sub(r'• (.*?)(?=<br>|</p>)', r'<li style="margin-bottom: 8px;">\1</li>', formatted_body)
+    if '<li' in formatted_body:
+        formatted_body = f'<ul style="padding-left: 20px;">{formatted_body}</ul>'
+    return formatted_body
+
+
+def format_email_body(body: str) -> str:
+    # _format_email_body doesn't touch the agent's state
+    return EmailAgent._format_email_body(EmailAgent.__new__(EmailAgent), body)
+
+
+@pytest.mark.parametrize("body", [
+    "",
+    "Hi there!",
+    "Hi there!\n\nWe're launching today.\nSee you soon.\n\nBest regards,\nThe Team",
+    "Features:\n• Track budgets\n• Weekly reports\n\nTry it now!",
+    "• First line bullet\nplain line\n• last line bullet",
+    "Intro\n\n\nthree newlines\n\n\n\nfour newlines",
+    "Bullets back to back:\n•  two spaces\n• \n• end",
+    "Not a bullet: •no space and a • mid-line item\nnext",
+    "Trailing newline\n",
+    "• Only bullet\n\n"
+])
+def test_matches_legacy_formatter(body):
+    assert format_email_body(body) == legacy_format_email_body(body)
@@ -0,0 +1,50 @@
+# tests/test_email_sender.py
+"""
+EmailSender validation before anything reaches the Gmail MCP server
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("langchain_mcp_adapters")
+
+from src.agents.email_sender import EmailSender
+
+
+class FakeMCPClient:
+    def __init__(self):
+        self.sent = []
+    
+    async def send_email(self, recipient, subject, body, html_body):
+        self.sent.append(recipient)
+        return {"success": True, "message_id": "msg-1"}
+
+
+@pytest.fixture
+def sender():
+    sender = EmailSender.__new__(EmailSender)
+    sender.mcp_client = FakeMCPClient()
+    return sender
+
+
+def test_padded_recipient_is_stripped_and_sent(sender):
+    result = asyncio.run(sender.send_email(" \tuser@example.com\n", "Launch", "Hello"))
+    
+    assert result["success"]
+    assert result["recipient"] == "user@example.com"
+    assert sender.mcp_client.sent == ["user@example.com"]
+
+
+@pytest.mark.parametrize("recipient", ["", "   ", "not-an-email", "user @example.com", "a@b@example.com"])
+def test_invalid_recipient_is_rejected(sender, recipient):
+    result = asyncio.run(sender.send_email(recipient, "Launch", "Hello"))
+    
+    assert result == {"success": False, "error": "Invalid email data"}
+    assert sender.mcp_client.sent == []
+
+
+def test_blank_subject_or_body_is_rejected(sender):
+    assert not asyncio.run(sender.send_email("user@example.com", "  ", "Hello"))["success"]
+    assert not asyncio.run(sender.send_email("user@example.com", "Launch", "\n"))["success"]
@@ -0,0 +1,55 @@
+# tests/test_leonardo_prompt_templates.py
+"""
+Per-category prompt templates in LeonardoAgent
+"""
+
+import pytest
+
+pytest.importorskip("google.genai")
+pytest.importorskip("PIL")
+pytest.importorskip("langchain")
+
+from src.agents.leonardo_agent import LeonardoAgent, _DESCRIPTION_SLOT, _NAME_SLOT
+
+
+@pytest.fixture
+def agent():
+    LeonardoAgent._prompt_templates.clear()
+    # _store_prompt_template only touches the class-level template cache
+    agent = LeonardoAgent.__new__(LeonardoAgent)
+    yield agent
+    LeonardoAgent._prompt_templates.clear()
+
+
+def test_description_containing_app_name_is_slotted(agent):
+    description = "FitPal tracks your daily workouts"
+    prompt = f"Athlete using FitPal on a phone, the screen reads: {description}, gym background"
+    
+    agent._store_prompt_template(("marketing", "healthcare"), prompt, "FitPal", description)
+    
+    template = LeonardoAgent._prompt_templates.get(("marketing", "healthcare"))
+    assert template == f"Athlete using {_NAME_SLOT} on a phone, the screen reads: {_DESCRIPTION_SLOT}, gym background"
+    
+    refilled = template.replace(_NAME_SLOT, "RunBuddy").replace(_DESCRIPTION_SLOT, "RunBuddy plans your runs")
+    assert "FitPal" not in refilled
+    assert "tracks your daily workouts" not in refilled
+
+
+def test_paraphrased_description_is_not_stored(agent):
+    prompt = "Athlete using FitPal on a phone in a modern gym"
+    
+    agent._store_prompt_template(("marketing", "healthcare"), prompt, "FitPal", "FitPal tracks your daily workouts")
+    
+    assert ("marketing", "healthcare") not in LeonardoAgent._prompt_templates
+
+
+def test_missing_description_is_not_stored(agent):
+    agent._store_prompt_template(("marketing", "healthcare"), "Athlete using FitPal", "FitPal", "")
+    
+    assert ("marketing", "healthcare") not in LeonardoAgent._prompt_templates
+
+
+def test_description_equal_to_app_name_is_not_stored(agent):
+    agent._store_prompt_template(("marketing", "finance"), "Person using Budgeteer", "Budgeteer", "Budgeteer")
+    
+    assert ("marketing", "finance") not in LeonardoAgent._prompt_templates
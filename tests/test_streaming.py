@@ -0,0 +1,61 @@
+# tests/test_streaming.py
+"""
+stream_generation - callback-based generation as an async iterator of events
+"""
+
+import asyncio
+
+from src.utils.streaming import stream_generation
+
+
+async def collect(generate):
+    return [event async for event in stream_generation(generate)]
+
+
+def test_tokens_then_result():
+    async def generate(on_token, on_reset):
+        for chunk in ("Hel", "lo"):
+            on_token(chunk)
+            await asyncio.sleep(0)
+        return "Hello"
+    
+    events = asyncio.run(collect(generate))
+    
+    assert events == [
+        {"type": "token", "content": "Hel"},
+        {"type": "token", "content": "lo"},
+        {"type": "result", "result": "Hello"}
+    ]
+
+
+def test_reset_is_forwarded_in_order():
+    async def generate(on_token, on_reset):
+        on_token("partial")
+        on_reset("stream broke")
+        on_token("fallback")
+        return "fallback"
+    
+    events = asyncio.run(collect(generate))
+    
+    assert [event["type"] for event in events] == ["token", "reset", "token", "result"]
+    assert events[1]["error"] == "stream broke"
+
+
+def test_consumer_leaving_cancels_generation():
+    cancelled = asyncio.Event()
+    
+    async def generate(on_token, on_reset):
+        on_token("first")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    
+    async def main():
+        stream = stream_generation(generate)
+        assert (await stream.__anext__())["content"] == "first"
+        await stream.aclose()
+        await asyncio.wait_for(cancelled.wait(), 1)
+    
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+# tests/test_ttl_cache.py
+"""
+TTLCache expiry and LRU eviction, and make_cache_key stability
+"""
+
+import pytest
+
+from src.utils import ttl_cache
+from src.utils.ttl_cache import TTLCache, make_cache_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_get_and_set(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("a", 1)
+    
+    assert cache.get("a") == 1
+    assert cache.get("missing") is None
+    assert len(cache) == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("a", 1)
+    
+    clock[0] += 9.9
+    assert cache.get("a") == 1
+    
+    clock[0] += 0.1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_overwrite_restarts_ttl(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("a", 1)
+    clock[0] += 8
+    cache.set("a", 2)
+    clock[0] += 8
+    
+    assert cache.get("a") == 2
+
+
+def test_evicts_least_recently_used(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # Reading "a" makes "b" the least recently used
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_maxsize_zero_disables_caching(clock):
+    cache = TTLCache(maxsize=0, ttl=10)
+    cache.set("a", 1)
+    
+    assert len(cache) == 0
+    assert cache.get("a") is None
+
+
+def test_clear(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.clear()
+    
+    assert len(cache) == 0
+
+
+def test_dict_operations(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache["a"] = 1
+    
+    assert cache["a"] == 1
+    assert "a" in cache
+    assert cache.get("missing", "default") == "default"
+    with pytest.raises(KeyError):
+        cache["missing"]
+    
+    del cache["a"]
+    assert "a" not in cache
+
+
+def test_contains_and_getitem_respect_expiry(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache["a"] = 1
+    clock[0] += 10
+    
+    assert "a" not in cache
+    with pytest.raises(KeyError):
+        cache["a"]
+
+def test_pop(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    
+    assert cache.pop("a") == 1
+    assert cache.pop("a", "gone") == "gone"
+    
+    clock[0] += 10
+    assert cache.pop("b", "expired") == "expired"
+    assert len(cache) == 0
+
+def test_make_cache_key_is_stable_and_order_sensitive():
+    assert make_cache_key("a", {"x": 1, "y": 2}) == make_cache_key("a", {"y": 2, "x": 1})
+    assert make_cache_key("a", "b") != make_cache_key("b", "a")
+    assert len(make_cache_key("a")) == 64